@@ -0,0 +1,250 @@
+import gzip
+import io
+import json
+import os
+import queue
+import re
+import tarfile
+import threading
+import zipfile
+from collections import deque
+from profiler import stage
+
+FORMATS = ('tar', 'zip', 'jsonl')
+COMPRESSIONS = ('gzip', 'zstd')
+
+def next_shard_index(output_dir, prefix, extension):
+    # Index after the highest prefix_NNNNN<extension> shard already in output_dir, so a new
+    # run continues the numbering and never overwrites shards of earlier runs
+    pattern = re.compile(rf"^{re.escape(prefix)}_(\d+){re.escape(extension)}$")
+    existing = [int(m.group(1)) for m in map(pattern.match, os.listdir(output_dir)) if m]
+    return max(existing) + 1 if existing else 0
+
+def _zstd():
+    # Optional dependency, only needed for --compression zstd
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+def _compress_frame(data, compression):
+    # Each record becomes an independent gzip member / zstd frame. Concatenated frames
+    # are still one valid .gz/.zst stream, but a single record can be decompressed from its offset.
+    if compression == 'gzip':
+        return gzip.compress(data, mtime=0)
+    if compression == 'zstd':
+        return _zstd().ZstdCompressor().compress(data)
+    return data
+
+def _decompress_frame(data, compression):
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if compression == 'zstd':
+        return _zstd().ZstdDecompressor().decompress(data)
+    return data
+
+def _tar_entry(name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = 0o644
+    padding = (-len(data)) % tarfile.BLOCKSIZE
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape') + data + b"\0" * padding
+
+class DirectoryWriter:
+    # Default output: one .scs file per variant
+    def __init__(self):
+        # Writes completed and on disk, in write order (see RunManifest.sync)
+        self.committed = 0
+
+    def write(self, out_file, content):
+        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+        with open(out_file, 'w') as f:
+            f.write(content)
+        self.committed += 1
+
+    def close(self):
+        pass
+
+class ShardWriter:
+    # Appends variants to rolling shards of shard_size records. Every shard gets a
+    # <shard>.idx.json sidecar mapping record name -> [offset, length] so one netlist
+    # can be read back with a single seek (see read_netlist).
+    def __init__(self, output_dir, fmt='tar', compression=None, shard_size=10000, prefix='shard'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown archive format: {fmt}")
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if fmt == 'zip' and compression == 'zstd':
+            raise ValueError("zip archives support gzip (deflate) compression only")
+        if compression == 'zstd':
+            _zstd()
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.compression = compression
+        self.shard_size = max(1, shard_size)
+        self.prefix = prefix
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.extension = f".{fmt}"
+        if compression == 'gzip' and fmt != 'zip':
+            self.extension += ".gz"
+        elif compression == 'zstd':
+            self.extension += ".zst"
+
+        self.shard_index = next_shard_index(output_dir, prefix, self.extension)
+
+        self.file = None
+        self.zip = None
+        self.index = {}
+        self.shard_path = None
+        # Writes in the open shard, and writes in closed (readable, indexed) shards
+        self.records = 0
+        self.committed = 0
+
+    def _open_shard(self):
+        self.shard_path = os.path.join(self.output_dir, f"{self.prefix}_{self.shard_index:05d}{self.extension}")
+        self.shard_index += 1
+        self.index = {}
+        if self.fmt == 'zip':
+            method = zipfile.ZIP_DEFLATED if self.compression == 'gzip' else zipfile.ZIP_STORED
+            self.zip = zipfile.ZipFile(self.shard_path, 'w', compression=method)
+        else:
+            self.file = open(self.shard_path, 'wb')
+
+    def write(self, out_file, content):
+        if self.file is None and self.zip is None:
+            self._open_shard()
+        name = os.path.basename(out_file)
+        data = content.encode('utf-8')
+
+        if self.fmt == 'zip':
+            self.zip.writestr(name, data)
+            self.index[name] = None # zip carries its own central directory
+        else:
+            if self.fmt == 'tar':
+                record = _tar_entry(name, data)
+            else:
+                record = (json.dumps({"name": name, "netlist": content}) + "\n").encode('utf-8')
+            frame = _compress_frame(record, self.compression)
+            offset = self.file.tell()
+            self.file.write(frame)
+            self.index[name] = [offset, len(frame)]
+
+        self.records += 1
+        if len(self.index) >= self.shard_size:
+            self._close_shard()
+
+    def _close_shard(self):
+        if self.zip is not None:
+            self.zip.close()
+            self.zip = None
+        elif self.file is not None:
+            if self.fmt == 'tar':
+                # End-of-archive marker as its own frame
+                self.file.write(_compress_frame(b"\0" * (2 * tarfile.BLOCKSIZE), self.compression))
+            self.file.close()
+            self.file = None
+        else:
+            return
+
+        meta = {"format": self.fmt, "compression": self.compression, "entries": self.index}
+        tmp_path = self.shard_path + ".idx.json.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.shard_path + ".idx.json")
+        self.committed += self.records
+        self.records = 0
+
+    def close(self):
+        self._close_shard()
+
+class WriteQueue:
+    # Front end for a DirectoryWriter/ShardWriter. With depth 0 every submit writes immediately;
+    # with depth > 0 writes run on one background thread behind a queue of at most depth rendered
+    # netlists, and submit blocks while it is full (backpressure). Either way outcomes come back
+    # from finished() as (tag, error) in submit order, so each error is reported against its task.
+    def __init__(self, writer, depth=0):
+        self.writer = writer
+        self.done = deque()
+        self.queue = None
+        self.thread = None
+        if depth > 0:
+            self.queue = queue.Queue(maxsize=depth)
+            self.thread = threading.Thread(target=self._drain, name="crucible-writer", daemon=True)
+            self.thread.start()
+
+    @property
+    def committed(self):
+        return self.writer.committed
+
+    def submit(self, out_file, content, tag, error=None, profile=None):
+        # A task that already failed (error set) still goes through the queue to keep outcomes in order
+        if self.queue is None:
+            self._write(out_file, content, tag, error, profile)
+        else:
+            self.queue.put((out_file, content, tag, error, profile))
+
+    def _drain(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            self._write(*item)
+
+    def _write(self, out_file, content, tag, error, profile):
+        if error is None:
+            try:
+                with stage(profile, 'write'):
+                    self.writer.write(out_file, content)
+            except Exception as e:
+                error = e
+        self.done.append((tag, error))
+
+    def finished(self):
+        # Outcomes of the writes completed since the last call
+        outcomes = []
+        while self.done:
+            outcomes.append(self.done.popleft())
+        return outcomes
+
+    def close(self):
+        # Flushes every pending write, then closes the underlying writer
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.writer.close()
+
+def read_netlist(shard_path, name):
+    # Extracts one netlist from a shard using its sidecar index (no full-shard scan)
+    with open(shard_path + ".idx.json", 'r') as f:
+        meta = json.load(f)
+    if name not in meta["entries"]:
+        raise KeyError(f"{name} not found in {shard_path}")
+
+    if meta["format"] == 'zip':
+        with zipfile.ZipFile(shard_path) as zf:
+            return zf.read(name).decode('utf-8')
+
+    offset, length = meta["entries"][name]
+    with open(shard_path, 'rb') as f:
+        f.seek(offset)
+        record = _decompress_frame(f.read(length), meta["compression"])
+
+    if meta["format"] == 'tar':
+        info = tarfile.TarInfo.frombuf(record[:tarfile.BLOCKSIZE], 'utf-8', 'surrogateescape')
+        if info.type in (tarfile.XHDTYPE, tarfile.XGLTYPE):
+            # PAX extended header precedes the real header (long names)
+            with tarfile.open(fileobj=io.BytesIO(record + b"\0" * (2 * tarfile.BLOCKSIZE))) as tf:
+                return tf.extractfile(tf.next()).read().decode('utf-8')
+        start = tarfile.BLOCKSIZE
+        return record[start:start + info.size].decode('utf-8')
+    return json.loads(record)["netlist"]
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python3 archive_writer.py <shard> <netlist_name>")
+        sys.exit(1)
+    sys.stdout.write(read_netlist(sys.argv[1], sys.argv[2]))
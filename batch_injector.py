@@ -0,0 +1,296 @@
+from circuit_breaker import ErrorInjector, Transistor, Resistor, Capacitor, task_rng, pick_targets, pick_short_pairs, transistor_indices
+from components import UNCONNECTED
+
+# Error bits that only move terminals between nets: 243 (short), 244 (open), 245 (KCL),
+# 246 (KVL), 247 (dangling port) and 255 (dropout). Vectors made only of these bits never
+# change the component list, device types or parameters, so a variant is fully described
+# by its terminal -> net array.
+RELABEL_BITS = (3, 4, 5, 6, 7, 15)
+RELABEL_MASK = sum(1 << bit for bit in RELABEL_BITS)
+
+def is_relabel_only(vector):
+    return vector & ~RELABEL_MASK == 0
+
+def _escape(text):
+    return str(text).replace('{', '{{').replace('}', '}}')
+
+class RelabelEngine:
+    # Holds one parsed source as a flat terminal -> net ID array and applies relabel-only
+    # vectors to many variants at once. Random draws replay ErrorInjector exactly (same
+    # per-bit task_rng streams, same candidate lists in the same order, drawn through the
+    # shared circuit_breaker target helpers), so every variant is byte-identical to the scalar
+    # path and --reproduce still holds. benchmarks/check_relabel_parity.py checks this.
+    #
+    # Per variant, terminal moves are recorded as sparse overrides of the base array and net
+    # shorts as union-find merges of net IDs; the whole batch is then resolved with array
+    # pointer-jumping and a single gather, and only turned into text at render time.
+    def __init__(self, parser):
+        import numpy as np # only needed once a relabel-only batch actually runs
+        self.parser = parser
+        self.template = parser.template
+        components = parser.components
+        if any(i == UNCONNECTED for c in components for i in c.nets):
+            raise ValueError("relabel engine requires every terminal to be connected")
+
+        # One real injector over a copy gives the starting net order and allocator state
+        probe = ErrorInjector(parser.copy(), verbose=False)
+        self.base_names = probe.graph.get_nets()
+        self.first_net = probe.next_net
+        self.ports = list(parser.ports)
+        base_id = {name: i for i, name in enumerate(self.base_names)}
+
+        self.comp_names = [c.name for c in components]
+        self.comp_terminals = [c.TERMINALS for c in components]
+        self.offsets = []
+        slots = []
+        for c in components:
+            self.offsets.append(len(slots))
+            slots.extend(base_id[n] for n in c.net_names())
+        self.base = np.array(slots, dtype=np.int32)
+        self.base_slots = slots
+        self.base_count = np.bincount(self.base, minlength=len(self.base_names)).tolist()
+        self.transistors = transistor_indices(components)
+
+        # Engine-wide name pool: net ID -> pool index -> name, shared by every variant
+        self.pool = list(self.base_names)
+        self.pool_index = {name: i for i, name in enumerate(self.pool)}
+
+        # Static text: everything except net names is fixed for relabel-only vectors
+        lines = []
+        for c in components:
+            holes = " ".join("{}" for _ in c.TERMINALS)
+            if isinstance(c, Transistor):
+                lines.append(f"{_escape(c.name)} {holes} {_escape(c.type)} {_escape(c.raw_params)}")
+            elif isinstance(c, Resistor):
+                lines.append(f"{_escape(c.name)} {holes} resistor {_escape(c.raw_params)}")
+            elif isinstance(c, Capacitor):
+                lines.append(f"{_escape(c.name)} {holes} capacitor {_escape(c.raw_params)}")
+            else:
+                lines.append("")
+        self.body_format = "\n".join(parser._body_lines(lines, _escape))
+        self.param_line = parser._render_parameter_line(self.template)
+        self.save_cmd = None
+        if self.template.has_save_slot:
+            self.save_cmd = "save V0:p Voutp Vinp Vinn" + "".join(
+                f" {n}:gm {n}:vgs {n}:vds {n}:ids {n}:region"
+                for n, c in zip(self.comp_names, components) if isinstance(c, Transistor))
+
+    def _pool_id(self, name):
+        i = self.pool_index.get(name)
+        if i is None:
+            i = self.pool_index[name] = len(self.pool)
+            self.pool.append(name)
+        return i
+
+    def inject(self, vector, master_seed, task_index, verbose=False, events=None):
+        # Replays ErrorInjector.inject for one relabel-only vector. The returned variant holds
+        # sparse terminal moves, net merges and its console lines (.output) for render_batch.
+        return _Variant(self, master_seed, task_index, verbose, events).run(vector)
+
+    def render_batch(self, variants, circuit_names, net_rows=None):
+        # Resolves a batch of injected variants with array ops and renders their netlists. With
+        # net_rows, each variant's terminal nets (component / TERMINALS order) are appended to it.
+        import numpy as np
+        if not variants:
+            return []
+        n_ids = max(len(v.parent) for v in variants)
+        parent = np.tile(np.arange(n_ids, dtype=np.int32), (len(variants), 1))
+        name_of = np.zeros((len(variants), n_ids), dtype=np.int32)
+        rows, slots, ids = [], [], []
+        for row, v in enumerate(variants):
+            parent[row, :len(v.parent)] = v.parent
+            name_of[row, :len(v.pool_ids)] = v.pool_ids
+            rows.extend([row] * len(v.overrides))
+            slots.extend(v.overrides)
+            ids.extend(v.overrides.values())
+
+        # Terminal -> net ID for the whole batch: base array plus sparse per-variant moves
+        nets = np.tile(self.base, (len(variants), 1))
+        if rows:
+            nets[rows, slots] = ids
+
+        # Pointer jumping collapses every merge chain to its root in O(log depth) passes
+        while True:
+            jumped = np.take_along_axis(parent, parent, axis=1)
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        names = np.take_along_axis(name_of, np.take_along_axis(parent, nets, axis=1), axis=1)
+
+        pool = np.array(self.pool, dtype=object)
+        tpl = self.template
+        head = [self.parser.pininfo] if self.parser.pininfo else []
+        ports = ' '.join(self.ports)
+        out = []
+        for cname, row in zip(circuit_names, pool[names]):
+            row = row.tolist()
+            if net_rows is not None:
+                net_rows.append(row)
+            topology = [f"*--- {cname} {ports} ---*"] + head
+            if self.body_format:
+                topology.append(self.body_format.format(*row))
+            out.append(tpl.render(topology, self.param_line, self.save_cmd))
+        return out
+
+class _Variant:
+    # Per-variant replay state. Net IDs index parent/count/pool_ids; a net name maps to at
+    # most one live ID (count > 0), and a name that comes back after dying gets a fresh ID.
+    # IDs are handed out in the order nets (re)appear, which is exactly the CircuitGraph
+    # node order, so the live IDs in ascending order reproduce get_nets().
+    def __init__(self, engine, master_seed, task_index, verbose, events):
+        self.engine = engine
+        self.master_seed = master_seed
+        self.task_index = task_index
+        self.verbose = verbose
+        self.events = events
+        self.output = []
+        self.bit = None
+        self.next_net = engine.first_net
+        self.overrides = {}
+        n = len(engine.base_names)
+        self.parent = list(range(n))
+        self.count = list(engine.base_count)
+        self.pool_ids = list(range(n))
+        self.live = dict(zip(engine.base_names, range(n)))
+
+    def _log(self, kind, message=None, component=None, terminal=None, old=None, new=None):
+        if self.verbose and message is not None:
+            self.output.append(message)
+        if self.events is not None:
+            self.events.append((self.task_index, self.bit, kind, component, terminal, old, new))
+
+    def _targets(self, candidates):
+        return pick_targets(self.rng, candidates)
+
+    def _new_net_name(self):
+        name = f"net{self.next_net}"
+        self.next_net += 1
+        return name
+
+    def _find(self, i):
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def _net_id(self, name):
+        # Live ID for name, or a fresh one if the net is not currently in the graph
+        i = self.live.get(name)
+        if i is None or self.count[i] == 0:
+            i = len(self.parent)
+            self.parent.append(i)
+            self.count.append(0)
+            self.pool_ids.append(self.engine._pool_id(name))
+            self.live[name] = i
+        return i
+
+    def _net_at(self, slot):
+        return self._find(self.overrides.get(slot, self.engine.base_slots[slot]))
+
+    def _name(self, net_id):
+        return self.engine.pool[self.pool_ids[net_id]]
+
+    def _connect(self, slot, name):
+        old = self._net_at(slot)
+        new = self._net_id(name)
+        if old == new:
+            return
+        self.count[old] -= 1
+        self.count[new] += 1
+        self.overrides[slot] = new
+
+    def _rename(self, old_name, new_name):
+        # CircuitGraph.rename_net: a dead old net moves nothing and creates nothing
+        old = self.live.get(old_name)
+        if old is None or self.count[old] == 0:
+            return
+        new = self._net_id(new_name)
+        if old == new:
+            return
+        self.parent[old] = new
+        self.count[new] += self.count[old]
+        self.count[old] = 0
+
+    def _get_nets(self):
+        return [self._name(i) for i, c in enumerate(self.count) if c > 0]
+
+    def _slot(self, k, terminal):
+        return self.engine.offsets[k] + self.engine.comp_terminals[k].index(terminal)
+
+    def run(self, vector):
+        error_map = {
+            3: self.error_ideal_short,       # 243
+            4: self.error_ideal_open,        # 244
+            5: self.error_kcl_conflict,      # 245
+            6: self.error_kvl_conflict,      # 246
+            7: self.error_port_dangling,     # 247
+            15: self.warning_dropout         # 255
+        }
+        for bit, func in error_map.items():
+            if (vector >> bit) & 1:
+                self.bit = bit
+                if self.verbose:
+                    self.output.append(f"Injecting Error Bit {bit} (ID {240+bit})")
+                self.rng = task_rng(self.master_seed, self.task_index, bit)
+                try:
+                    func()
+                except Exception as e:
+                    self._log('inject_failed', f"Failed to inject error {240+bit}: {e}", new=str(e))
+        return self
+
+    # 243
+    def error_ideal_short(self):
+        for n1, n2 in pick_short_pairs(self.rng, self._get_nets()):
+            self._log('short', f"  Ideal Short: Shorting {n2} to {n1}", None, None, n2, n1)
+            self._rename(n2, n1)
+
+    # 244
+    def error_ideal_open(self):
+        engine = self.engine
+        targets = self._targets(range(len(engine.comp_names)))
+        for k in targets:
+            name = engine.comp_names[k]
+            for term in self._targets(engine.comp_terminals[k]):
+                slot = self._slot(k, term)
+                old_net = self._name(self._net_at(slot))
+                new_net = self._new_net_name()
+                self._connect(slot, new_net)
+                self._log('open', f"  Ideal Open: Opened {name}:{term} (was {old_net}, now {new_net})", name, term, old_net, new_net)
+
+    # 245
+    def error_kcl_conflict(self):
+        targets = self._targets(self._get_nets())
+        for t_net in targets:
+            conflict_net = 'vdd!' if self.rng.random() > 0.5 else 'gnd!'
+            self._log('kcl_conflict', f"  KCL Conflict: Shorting {t_net} to {conflict_net}", None, None, t_net, conflict_net)
+            self._rename(t_net, conflict_net)
+
+    # 246
+    def error_kvl_conflict(self):
+        engine = self.engine
+        for k in self._targets(engine.transistors):
+            net_d = self._name(self._net_at(self._slot(k, 'D')))
+            net_s = self._name(self._net_at(self._slot(k, 'S')))
+            self._connect(self._slot(k, 'D'), net_s)
+            self._log('kvl_conflict', f"  KVL Conflict: Shorted D-S of {engine.comp_names[k]}", engine.comp_names[k], 'D', net_d, net_s)
+
+    # 247
+    def error_port_dangling(self):
+        if not self.engine.ports: return
+        for port in self._targets(self.engine.ports):
+            new_net = self._new_net_name()
+            self._log('port_dangling', f"  Dangling Port: Disconnecting internals from {port} to {new_net}", None, None, port, new_net)
+            self._rename(port, new_net)
+
+    # 255
+    def warning_dropout(self):
+        engine = self.engine
+        for k in self._targets(engine.transistors):
+            slot = self._slot(k, 'B')
+            old_net = self._name(self._net_at(slot))
+            new_net = self._new_net_name()
+            self._connect(slot, new_net)
+            self._log('dropout', f"  Dropout Warning: Floated Body of {engine.comp_names[k]} to {new_net}", engine.comp_names[k], 'B', old_net, new_net)
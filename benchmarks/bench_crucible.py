@@ -0,0 +1,161 @@
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import NetlistParser, ErrorInjector
+from synth_netlist import write_netlist
+
+BIT_NAMES = [
+    "non_modal", "source_absent", "galvanic_island", "ideal_short",
+    "ideal_open", "kcl_conflict", "kvl_conflict", "port_dangling",
+    "bias_path", "symmetry", "loop_phase", "impedance",
+    "stack", "steering", "isolation", "dropout",
+]
+
+def _time(fn, repeat):
+    # Best-of-repeat wall time in seconds; fn returns nothing
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_size(path, repeat, seed, bits):
+    result = {}
+
+    def parse():
+        p = NetlistParser(path)
+        p.parse()
+
+    result["parse"] = _time(parse, repeat)
+
+    base = NetlistParser(path)
+    base.parse()
+    result["n_components"] = len(base.components)
+
+    result["regenerate"] = _time(lambda: base.copy().regenerate(), repeat)
+
+    result["inject"] = {}
+    for bit in bits:
+        times = []
+        for r in range(repeat):
+            # Copy outside the timed region; the injector itself (incl. graph build) is timed
+            netlist = base.copy()
+            start = time.perf_counter()
+            ErrorInjector(netlist, seed=seed, task_index=r, verbose=False).inject(1 << bit)
+            times.append(time.perf_counter() - start)
+        result["inject"][str(bit)] = min(times)
+    return result
+
+def scaling_exponents(sizes, values):
+    # Empirical exponent k in t ~ n^k between consecutive sizes
+    out = []
+    for (n0, t0), (n1, t1) in zip(zip(sizes, values), zip(sizes[1:], values[1:])):
+        if t0 > 0 and t1 > 0 and n1 != n0:
+            out.append(round(math.log(t1 / t0) / math.log(n1 / n0), 3))
+        else:
+            out.append(None)
+    return out
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "-C", REPO_ROOT, "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def print_report(report, baseline=None):
+    sizes = report["sizes"]
+    rows = [("parse", [r["parse"] for r in report["results"]])]
+    rows.append(("regenerate", [r["regenerate"] for r in report["results"]]))
+    for bit in report["bits"]:
+        rows.append((f"bit {bit:>2} ({240 + bit}) {BIT_NAMES[bit]}", [r["inject"][str(bit)] for r in report["results"]]))
+
+    header = f"{'stage':<32}" + "".join(f"{n:>12}" for n in sizes) + "   exponents"
+    print(header)
+    print("-" * len(header))
+    for label, values in rows:
+        exps = report["scaling"][label.split(' (')[0] if label.startswith("bit") else label]
+        print(f"{label:<32}" + "".join(f"{v * 1e3:>10.2f}ms" for v in values) + "   " + " ".join(str(e) for e in exps))
+
+    if baseline:
+        print(f"\nRatio vs baseline {baseline.get('revision')} (new / old, per size):")
+        base_by_size = {r["n_transistors"]: r for r in baseline["results"]}
+        for label, values in rows:
+            key = label.split(' (')[0]
+            ratios = []
+            for n, v in zip(sizes, values):
+                old = base_by_size.get(n)
+                if old is None:
+                    ratios.append("       -")
+                    continue
+                old_v = old["parse"] if key == "parse" else old["regenerate"] if key == "regenerate" else old["inject"].get(key.split()[1])
+                ratios.append(f"{v / old_v:>8.2f}" if old_v else "       -")
+            print(f"{label:<32}" + "    ".join(ratios))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse, per-bit injection and regenerate on synthetic netlists.")
+    parser.add_argument("--sizes", type=str, default="10,100,1000,10000", help="Comma-separated transistor counts (up to 100000).")
+    parser.add_argument("--bits", type=str, default=",".join(str(b) for b in range(16)), help="Comma-separated error bits (0-15) to time.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per measurement (best time is reported).")
+    parser.add_argument("--seed", type=int, default=1, help="Master seed passed to the injector.")
+    parser.add_argument("--output", type=str, help="JSON results path. Defaults to benchmarks/results/bench_<timestamp>.json.")
+    parser.add_argument("--compare", type=str, help="Previous results JSON to print per-stage ratios against.")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    bits = [int(b) for b in args.bits.split(',') if b]
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "sizes": sizes,
+        "bits": bits,
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = write_netlist(os.path.join(tmp, f"synth_{n}.scs"), n)
+            print(f"Benchmarking {n} transistors ({os.path.getsize(path) / 1024:.0f} KiB)...", file=sys.stderr)
+            result = bench_size(path, args.repeat, args.seed, bits)
+            result["n_transistors"] = n
+            result["file_bytes"] = os.path.getsize(path)
+            report["results"].append(result)
+
+    report["scaling"] = {
+        "parse": scaling_exponents(sizes, [r["parse"] for r in report["results"]]),
+        "regenerate": scaling_exponents(sizes, [r["regenerate"] for r in report["results"]]),
+    }
+    for bit in bits:
+        report["scaling"][f"bit {bit:>2}"] = scaling_exponents(sizes, [r["inject"][str(bit)] for r in report["results"]])
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = args.output or os.path.join(REPO_ROOT, "benchmarks", "results", f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to '{output}'")
+
+if __name__ == "__main__":
+    main()
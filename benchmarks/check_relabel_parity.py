@@ -0,0 +1,87 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch_injector import RELABEL_BITS
+from template_cache import TemplateCache
+from task_pipeline import render_chunk
+from synth_netlist import write_netlist
+
+# Renders the same relabel-only tasks through the vectorized RelabelEngine and through the scalar
+# ErrorInjector (what --scalar_only runs) and compares netlists, fault events and console output.
+# Any difference means batch_injector._Variant has drifted from ErrorInjector.
+
+def relabel_vectors(rng, count):
+    # Random non-empty combinations of the relabel-only bits, plus every single bit
+    vectors = [1 << bit for bit in RELABEL_BITS]
+    while len(vectors) < count:
+        vector = sum(1 << bit for bit in RELABEL_BITS if rng.random() < 0.5)
+        if vector:
+            vectors.append(vector)
+    return vectors
+
+def _strip_date(content):
+    # The provenance header carries the wall-clock date, which may tick between the two renders
+    if content is None:
+        return None
+    return "\n".join(line for line in content.split("\n") if not line.startswith("* Date:"))
+
+def check_source(source, vectors, master_seed, chunk_size):
+    # Returns a list of (task index, vector, what differed)
+    tasks = [(i, source, f"{i}.scs", vector) for i, vector in enumerate(vectors)]
+    mismatches = []
+    for start in range(0, len(tasks), chunk_size):
+        chunk = tasks[start:start + chunk_size]
+        fast = render_chunk(TemplateCache(), chunk, master_seed, log_events=True, relabel=True)
+        slow = render_chunk(TemplateCache(), chunk, master_seed, log_events=True, relabel=False)
+        for (i, _, _, vector), a, b in zip(chunk, fast, slow):
+            content_a, error_a, events_a, _, output_a, _, _ = a
+            content_b, error_b, events_b, _, output_b, _, _ = b
+            if _strip_date(content_a) != _strip_date(content_b):
+                mismatches.append((i, vector, "netlist"))
+            elif events_a != events_b:
+                mismatches.append((i, vector, "events"))
+            elif output_a != output_b:
+                mismatches.append((i, vector, "console output"))
+            elif (error_a is None) != (error_b is None):
+                mismatches.append((i, vector, "error"))
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that relabel-only vectors render identically with and without the vectorized relabel engine.")
+    parser.add_argument("sources", nargs='*', help="Netlist files to check. Defaults to synthetic netlists of --sizes transistors.")
+    parser.add_argument("--sizes", type=str, default="10,100,1000", help="Comma-separated transistor counts of the synthetic netlists used when no sources are given.")
+    parser.add_argument("--vectors", type=int, default=200, help="Number of relabel-only vectors per source (every single bit is always included).")
+    parser.add_argument("--seed", type=int, default=1, help="Master seed for the rendered tasks and the vector draw.")
+    parser.add_argument("--chunk_size", type=int, default=64, help="Tasks per render_chunk call (the CLI batches 64).")
+    args = parser.parse_args()
+
+    vectors = relabel_vectors(random.Random(args.seed), args.vectors)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = [os.path.abspath(s) for s in args.sources]
+        if not sources:
+            sizes = [int(s) for s in args.sizes.split(',') if s]
+            sources = [write_netlist(os.path.join(tmp, f"synth_{n}.scs"), n) for n in sizes]
+        for source in sources:
+            if not os.path.isfile(source):
+                print(f"Error: '{source}' not found.")
+                sys.exit(1)
+            mismatches = check_source(source, vectors, args.seed, args.chunk_size)
+            if mismatches:
+                failed = True
+                print(f"[FAIL] {source}: {len(mismatches)}/{len(vectors)} tasks differ")
+                for i, vector, what in mismatches[:10]:
+                    print(f"  task {i} (Vector: {vector:016b}): {what}")
+            else:
+                print(f"[OK] {source}: {len(vectors)} tasks identical")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+
+# Synthetic op-amp style netlists for benchmarking. Each cell is a cascoded differential
+# stage: tail current source on a bias net, input pair, NMOS cascodes, diode-connected
+# PMOS mirror load, a PMOS bias device, plus an RC on the stage output. Cells chain
+# output -> next cell's input, so the netlist stays connected at any size.
+TRANSISTORS_PER_CELL = 8
+
+# Parameter slots are reused across cells so the parameters line stays bounded
+N_GEOMETRY_PARAMS = 32
+
+PRE_TOPOLOGY = """simulator lang=spectre
+global 0 gnd! vdd!
+parameters vdd={{{{vdd}}}} vcm={{{{vcm}}}} vbiasn0={{{{vbiasn0}}}} vbiasp0={{{{vbiasp0}}}} {geometry}
+
+"""
+
+POST_TOPOLOGY = """
+*--- TESTBENCH ---*
+
+*--- Ground, VDD, & VCM ---*
+VS (gnd! 0) vsource dc=0 type=dc
+V0 (vdd! gnd!) vsource dc=vdd ac=1 type=dc
+V1 (cm gnd!) vsource dc=vcm ac = 1 type=dc
+
+*--- Inputs ---*
+Vinp_src (Vinp cm) vsource dc=0 ac=0.5 type=dc
+Vinn_src (Vinn cm) vsource dc=0 ac=-0.5 type=dc
+
+*--- Bias Values ---*
+VP0 (Vbiasp0 gnd!) vsource dc=vbiasp0 type=dc
+VN0 (Vbiasn0 gnd!) vsource dc=vbiasn0 type=dc
+
+*--- Data Export ---*
+dcOp_sim dc
+save V0:p Voutp Vinp Vinn
+"""
+
+def generate_netlist(n_transistors, name="synth_ota"):
+    # Returns .scs text with roughly n_transistors devices (rounded up to whole cells)
+    n_cells = max(1, -(-n_transistors // TRANSISTORS_PER_CELL))
+    n_params = min(N_GEOMETRY_PARAMS, n_cells * TRANSISTORS_PER_CELL)
+    geometry = " ".join([f"nA{k}={{{{nA{k}}}}}" for k in range(1, n_params + 1)] +
+                        [f"nB{k}={{{{nB{k}}}}}" for k in range(1, n_params + 1)] +
+                        ["nR1={{nR1}}", "nC1={{nC1}}"])
+
+    lines = [f"*--- {name} Vbiasn0 Vbiasp0 Vinn Vinp Voutp ---*",
+             "*.PININFO Vbiasn0:I Vbiasp0:I Vinn:I Vinp:I Voutp:O"]
+    counter = [0]
+
+    def mos(d, g, s, b, type_):
+        idx = counter[0]
+        counter[0] += 1
+        k = idx % n_params + 1
+        lines.append(f"MM{idx} {d} {g} {s} {b} {type_} l=nA{k} nfin=nB{k}")
+
+    net = [0]
+
+    def new_net():
+        net[0] += 1
+        return f"net{net[0]}"
+
+    inp, inn = "Vinp", "Vinn"
+    for cell in range(n_cells):
+        last = cell == n_cells - 1
+        tail, xa, xb, ya, outb = new_net(), new_net(), new_net(), new_net(), new_net()
+        out = "Voutp" if last else new_net()
+        pb = new_net()
+
+        mos(tail, "Vbiasn0", "gnd!", "gnd!", "nfet")     # tail current source
+        mos(xa, inp, tail, "gnd!", "nfet")               # input pair
+        mos(xb, inn, tail, "gnd!", "nfet")
+        mos(ya, "Vbiasn0", xa, "gnd!", "nfet")            # cascodes (source on input pair drain)
+        mos(out, "Vbiasn0", xb, "gnd!", "nfet")
+        mos(ya, ya, "vdd!", "vdd!", "pfet")               # diode-connected mirror reference
+        mos(out, ya, "vdd!", "vdd!", "pfet")              # mirror output
+        mos(pb, "Vbiasp0", "vdd!", "vdd!", "pfet")        # bias branch
+        lines.append(f"RR{cell} {out} {outb} resistor r=nR1")
+        lines.append(f"CC{cell} ({outb} gnd!) capacitor c=nC1")
+
+        # Next stage is driven differentially by this stage's output and its RC node
+        inp, inn = out, outb
+
+    return (PRE_TOPOLOGY.format(geometry=geometry) + "*--- TOPOLOGY ---*\n\n" +
+            "\n".join(lines) + "\n\n" + POST_TOPOLOGY)
+
+def write_netlist(path, n_transistors):
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'w') as f:
+        f.write(generate_netlist(n_transistors, name=name))
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic op-amp style .scs netlist.")
+    parser.add_argument("n_transistors", type=int, help="Approximate number of transistors.")
+    parser.add_argument("output_file", help="Path of the .scs file to write.")
+    args = parser.parse_args()
+    write_netlist(args.output_file, args.n_transistors)
+    print(f"Wrote '{args.output_file}'")
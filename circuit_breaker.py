@@ -1,201 +1,296 @@
 
+import bisect
+import hashlib
+import io
 import random
-import networkx as nx
-from components import Component, Transistor, Resistor, Capacitor
+import re
+from profiler import stage
+from components import NetTable, Component, Transistor, Resistor, Capacitor
+
+# Generator revision recorded in run manifests. Bump whenever the same (source, master seed,
+# task index, vector) would render a different netlist, so --incremental regenerates stale artifacts.
+CRUCIBLE_VERSION = "1.3.0.dev2"
+
+TOPOLOGY_MARKER = "*--- TOPOLOGY ---*"
+TESTBENCH_MARKER = "*--- TESTBENCH ---*"
+
+# Precompiled tokenizer patterns (matched against one stripped logical line)
+_HEADER_RE = re.compile(r"\*---(.*)---\*$")
+# "name (n1 n2 ...) rest" - parenthesized node list, any device type
+_NODE_LIST_RE = re.compile(r"([^\s(]+)\s*\(([^()]*)\)\s*(.*)$")
+# nA{N}/nB{N}/nR{N}/nC{N} keys on a "parameters" line
+_PARAM_INDEX_RE = re.compile(r"(?:^|\s)n([ABRC])(\d+)=")
+
+# Name prefix -> (component class, number of nodes, type keyword written between nodes and params)
+DEVICE_KINDS = {
+    'M': (Transistor, 4, None),
+    'R': (Resistor, 2, 'resistor'),
+    'C': (Capacitor, 2, 'capacitor'),
+}
+
+# Prefixes of the per-device geometry/value parameters (nA: l, nB: nfin/w, nR: r, nC: c)
+PARAM_PREFIXES = ('nA', 'nB', 'nR', 'nC')
+
+def _param_sort_key(name):
+    try:
+        return int(name[2:])
+    except ValueError:
+        return 999999
+
+class ParameterRegistry:
+    # Parameters a netlist adds on top of its source "parameters" line, plus a reference count of
+    # every nA/nB/nR/nC name the components mention. Counts follow each raw_params change
+    # (retain/release), and the names in use are kept sorted per prefix, so rendering the
+    # parameters line never rescans the components.
+    def __init__(self):
+        # Added parameters, name -> value, in the order they were added
+        self.values = {}
+        self.next_index = dict.fromkeys(PARAM_PREFIXES, 1)
+        # Referenced name -> number of mentions across all components
+        self.refs = {}
+        # prefix -> referenced names, sorted by index
+        self.used = {prefix: [] for prefix in PARAM_PREFIXES}
+
+    def copy(self):
+        new = ParameterRegistry.__new__(ParameterRegistry)
+        new.values = dict(self.values)
+        new.next_index = dict(self.next_index)
+        new.refs = dict(self.refs)
+        new.used = {prefix: list(names) for prefix, names in self.used.items()}
+        return new
+
+    def reserve(self, prefix, index):
+        # Keeps index (already taken by the source) from being handed out
+        if index >= self.next_index[prefix]:
+            self.next_index[prefix] = index + 1
+
+    def next_name(self, prefix):
+        if prefix in self.next_index:
+            name = f"{prefix}{self.next_index[prefix]}"
+            self.next_index[prefix] += 1
+            return name
+        # Default/Fallback
+        return f"{prefix}_{len(self.values)}"
+
+    def add(self, name, value):
+        self.values[name] = value
+
+    def new(self, prefix, value):
+        # Allocates the next name of a series and registers its value
+        name = self.next_name(prefix)
+        self.add(name, value)
+        return name
+
+    @staticmethod
+    def references(raw_params):
+        # nA/nB/nR/nC names mentioned by a device's params ("l=nA1 nfin=nB2" -> nA1, nB2)
+        refs = []
+        for t in raw_params.replace('=', ' ').split():
+            if t[:2] in PARAM_PREFIXES:
+                # It might be nA1 or nA1) or nA1} etc (unlikely but safe to strip)
+                refs.append("".join([c for c in t if c.isalnum()]))
+        return refs
+
+    def retain(self, raw_params):
+        for name in self.references(raw_params):
+            count = self.refs.get(name, 0)
+            self.refs[name] = count + 1
+            if count == 0:
+                bisect.insort(self.used[name[:2]], name, key=_param_sort_key)
+
+    def release(self, raw_params):
+        for name in self.references(raw_params):
+            count = self.refs[name] - 1
+            if count:
+                self.refs[name] = count
+            else:
+                del self.refs[name]
+                self.used[name[:2]].remove(name)
 
 class NetlistParser:
     def __init__(self, filepath):
         self.filepath = filepath
-        self.content = ""
-        self.topology_block = ""
         self.pre_topology = ""
         self.post_topology = ""
         self.circuit_name = ""
         self.ports = []
         self.pininfo = ""
         self.components = []
-        self.new_parameters = {}
-        self.next_nA = 1
-        self.next_nB = 1
-        self.next_nR = 1
-        self.next_nC = 1
+        # Net name <-> ID table of this netlist, shared with its copies
+        self.nets = NetTable()
+        # Unrecognized topology statements, kept verbatim: (number of components before it, text).
+        # Their nets are not part of the graph, so faults never rewire them.
+        self.passthrough = []
+        # Nets named by passthrough statements, so injected nets never collide with them
+        self.passthrough_nets = []
+        # Added parameters and reference counts of the nA/nB/nR/nC names in use
+        self.params = ParameterRegistry()
+        # Compiled render template, shared (read-only) by copies of this parser
+        self.template = None
         
-    def parse(self):
-        with open(self.filepath, 'r') as f:
-            self.content = f.read()
-            
-        parts = self.content.split("*--- TOPOLOGY ---*")
-        if len(parts) != 2:
-            raise ValueError("File does not contain exactly one *--- TOPOLOGY ---* block")
-            
-        self.pre_topology = parts[0] + "*--- TOPOLOGY ---*\n\n"
-        
-        # Parse existing parameters to find max nA/nB
-        self._parse_existing_parameters()
-        
-        topology_part = parts[1]
-        if "*--- TESTBENCH ---*" in topology_part:
-            topo_split = topology_part.split("*--- TESTBENCH ---*")
-            self.topology_block = topo_split[0]
-            self.post_topology = "\n*--- TESTBENCH ---*" + topo_split[1]
+    def parse(self, content=None):
+        # content may be supplied by a caller that already read the file; otherwise the file is
+        # streamed. One pass over the lines: only the pre/post-topology text (the render template)
+        # is kept, topology statements become components as they are read.
+        if content is None:
+            with open(self.filepath, 'r') as f:
+                self._parse_lines(f)
         else:
-            self.topology_block = topology_part
-            self.post_topology = ""
-            
-        self._parse_topology_block()
+            self._parse_lines(io.StringIO(content))
+        self.template = CompiledTemplate(self.pre_topology, self.post_topology)
 
-    def _parse_existing_parameters(self):
-        # Look for "parameters ..." line in pre_topology
-        lines = self.pre_topology.split('\n')
+    def _parse_lines(self, lines):
+        pre, post = [], []
+        # Physical lines of a statement continued with a trailing backslash
+        pending = []
+        self.components = []
+        self.nets = NetTable()
+        self.passthrough = []
+        self.passthrough_nets = []
+        self.params = ParameterRegistry()
+        section = 'pre'
         for line in lines:
-            if line.strip().startswith('parameters '):
-                tokens = line.strip().split()
-                for t in tokens[1:]: # Skip 'parameters' keyword
-                    if '=' in t:
-                        k, v = t.split('=')
-                        # Check for nA{N} or nB{N}
-                        if k.startswith('nA'):
-                            try:
-                                val = int(k[2:])
-                                if val >= self.next_nA: self.next_nA = val + 1
-                            except ValueError: pass
-                        elif k.startswith('nB'):
-                            try:
-                                val = int(k[2:])
-                                if val >= self.next_nB: self.next_nB = val + 1
-                            except ValueError: pass
-                        elif k.startswith('nR'):
-                            try:
-                                val = int(k[2:])
-                                if val >= self.next_nR: self.next_nR = val + 1
-                            except ValueError: pass
-                        elif k.startswith('nC'):
-                            try:
-                                val = int(k[2:])
-                                if val >= self.next_nC: self.next_nC = val + 1
-                            except ValueError: pass
-
-    def get_next_param_name(self, prefix='nA'):
-        if prefix == 'nA':
-            name = f"nA{self.next_nA}"
-            self.next_nA += 1
-            return name
-        elif prefix == 'nB':
-            name = f"nB{self.next_nB}"
-            self.next_nB += 1
-            return name
-        elif prefix == 'nR':
-            name = f"nR{self.next_nR}"
-            self.next_nR += 1
-            return name
-        elif prefix == 'nC':
-            name = f"nC{self.next_nC}"
-            self.next_nC += 1
-            return name
-        else:
-            # Default/Fallback
-            idx = len(self.new_parameters)
-            return f"{prefix}_{idx}"
+            if section == 'pre':
+                at = line.find(TOPOLOGY_MARKER)
+                if at < 0:
+                    pre.append(line)
+                    if line.lstrip().startswith('parameters '):
+                        self._scan_parameter_line(line)
+                    continue
+                pre.append(line[:at])
+                line = line[at + len(TOPOLOGY_MARKER):]
+                section = 'topology'
+            if TOPOLOGY_MARKER in line:
+                raise ValueError("File does not contain exactly one *--- TOPOLOGY ---* block")
+            if section == 'topology':
+                at = line.find(TESTBENCH_MARKER)
+                if at < 0:
+                    self._feed_topology_line(line, pending)
+                    continue
+                self._feed_topology_line(line[:at], pending)
+                post.append("\n" + TESTBENCH_MARKER)
+                line = line[at + len(TESTBENCH_MARKER):]
+                section = 'post'
+            post.append(line)
 
-    def add_parameter(self, name, value):
-        self.new_parameters[name] = value
+        if section == 'pre':
+            raise ValueError("File does not contain exactly one *--- TOPOLOGY ---* block")
+        if pending:
+            # Continuation at the end of the block
+            self._parse_statement(pending, "")
+        self.pre_topology = "".join(pre) + TOPOLOGY_MARKER + "\n\n"
+        self.post_topology = "".join(post)
+        if self.passthrough:
+            names = [text.split(None, 1)[0] for _, text in self.passthrough]
+            more = f", ... ({len(names)} total)" if len(names) > 5 else ""
+            print(f"Warning: {self.filepath}: kept unrecognized statements verbatim: {', '.join(names[:5])}{more}")
 
-    def _parse_topology_block(self):
-        lines = self.topology_block.strip().split('\n')
-        self.components = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line: continue
-            
-            if line.startswith("*---") and line.endswith("---*"):
-                content = line[4:-4].strip()
-                tokens = content.split()
-                if len(tokens) > 0:
-                    self.circuit_name = tokens[0]
-                    self.ports = tokens[1:]
-            elif line.startswith("*.PININFO"):
-                self.pininfo = line
-            elif line.startswith("*"):
-                continue
-            else:
-                self._parse_component(line)
+    def _scan_parameter_line(self, line):
+        # Advance nA/nB/nR/nC past the indexes the source already uses
+        for kind, index in _PARAM_INDEX_RE.findall(line):
+            self.params.reserve(f"n{kind}", int(index))
 
-    def _parse_component(self, line):
-        tokens = line.split()
-        name = tokens[0]
-        
-        if name.startswith('M') or name.startswith('MM'):
-            # Transistor: Name D G S B Type Params...
-            d, g, s, b = tokens[1:5]
-            type_ = tokens[5]
-            params = " ".join(tokens[6:])
-            comp = Transistor(name, type_, raw_params=params)
-            comp.connect('D', d)
-            comp.connect('G', g)
-            comp.connect('S', s)
-            comp.connect('B', b)
-            self.components.append(comp)
-            
-        elif name.startswith('C') or name.startswith('CC'):
-            self._parse_passive(name, tokens, Capacitor, 'capacitor')
+    def copy(self):
+        # Cheap independent copy of a parsed netlist: text blocks are shared,
+        # components and parameter bookkeeping are duplicated so an injector can mutate them
+        new = NetlistParser.__new__(NetlistParser)
+        new.__dict__.update(self.__dict__)
+        new.ports = list(self.ports)
+        new.components = [c.copy() for c in self.components]
+        new.params = self.params.copy()
+        return new
 
-        elif name.startswith('R'):
-             self._parse_passive(name, tokens, Resistor, 'resistor')
+    def _feed_topology_line(self, line, pending):
+        line = line.strip()
+        if not pending:
+            if not line:
+                return
+            if line.startswith("*"):
+                header = _HEADER_RE.match(line)
+                if header:
+                    tokens = header.group(1).split()
+                    if len(tokens) > 0:
+                        self.circuit_name = tokens[0]
+                        self.ports = tokens[1:]
+                elif line.startswith("*.PININFO"):
+                    self.pininfo = line
+                return
+            if line.startswith("//"):
+                return
+        if line.endswith("\\"):
+            pending.append(line)
+            return
+        self._parse_statement(pending, line)
+        pending.clear()
 
-    def _parse_passive(self, name, tokens, cls, type_keyword):
-        # Handles both "C1 n1 n2 ..." and "C1 (n1 n2) ..."
-        # and "C1 ... capacitor ..." pattern
-        
-        remaining = tokens[1:]
-        idx = 0
-        nodes = []
-        
-        # Check for parens (n1 n2)
-        if remaining[0].startswith('('):
-            nodes_str = ""
-            while idx < len(remaining):
-                nodes_str += remaining[idx]
-                if remaining[idx].endswith(')'):
-                    idx += 1
-                    break
-                idx += 1
-            nodes_str = nodes_str.replace('(', '').replace(')', '')
-            nodes = nodes_str.split()
+    def _parse_statement(self, continued, line):
+        # continued: physical lines ending in a backslash, line: the last one
+        if continued:
+            text = " ".join([l[:-1] for l in continued] + [line])
         else:
-            # No parens: n1 n2 type ...
-            # Assume 2 nodes
-            nodes = [remaining[0], remaining[1]]
-            idx = 2
-            
-        if len(nodes) != 2:
-            return # Error or unknown format
-            
-        p, n = nodes[0], nodes[1]
-        
-        # Check for type keyword (capacitor/resistor) to find where params start
-        # Usually it follows nodes.
-        params = ""
-        # Search for keyword starting from current idx
-        # But based on typical .scs, it's: Name Nodes Type Params
-        # or Name Nodes Params (if type implicit? but here we see explicit type)
-        
-        # If the next token is the type keyword, skip it
-        if idx < len(remaining) and remaining[idx] == type_keyword:
-             params = " ".join(remaining[idx+1:])
+            text = line
+        if not text.strip():
+            return
+        if not self._parse_component(text):
+            self.passthrough.append((len(self.components), "\n".join(continued + [line]).rstrip()))
+
+    def _parse_component(self, text):
+        # Handles "Name n1 n2 ... Type params" and "Name (n1 n2 ...) Type params" for every
+        # known device; returns False (statement kept verbatim) for anything else
+        node_list = _NODE_LIST_RE.match(text)
+        if node_list:
+            name, rest = node_list.group(1), node_list.group(3).split()
+            nodes = node_list.group(2).split()
         else:
-             # Just join remaining?
-             params = " ".join(remaining[idx:])
+            tokens = text.split()
+            name, rest, nodes = tokens[0], tokens[1:], None
+
+        kind = DEVICE_KINDS.get(name[0])
+        if kind is None:
+            self.passthrough_nets.extend(nodes if nodes is not None else [t for t in rest if '=' not in t])
+            return False
+        cls, node_count, type_keyword = kind
+        if nodes is None:
+            nodes, rest = rest[:node_count], rest[node_count:]
+        if len(nodes) != node_count:
+            self.passthrough_nets.extend(nodes)
+            return False
 
-        comp = cls(name, raw_params=params)
-        comp.connect('P', p)
-        comp.connect('N', n)
+        if type_keyword is None:
+            # Transistor: model name, then params
+            if not rest:
+                self.passthrough_nets.extend(nodes)
+                return False
+            comp = cls(name, rest[0], raw_params=" ".join(rest[1:]), table=self.nets)
+        else:
+            # Passive: the type keyword usually follows the nodes
+            if rest and rest[0] == type_keyword:
+                rest = rest[1:]
+            comp = cls(name, raw_params=" ".join(rest), table=self.nets)
+        for terminal, net in zip(cls.TERMINALS, nodes):
+            comp.connect(terminal, net)
         self.components.append(comp)
+        self.params.retain(comp.raw_params)
+        return True
 
-    def add_parameter(self, name, value):
-        self.new_parameters[name] = value
+    def _body_lines(self, component_lines, escape=None):
+        # Component lines with the passthrough statements put back at their source positions
+        if not self.passthrough:
+            return component_lines
+        out = []
+        k = 0
+        for position, text in self.passthrough:
+            out.extend(component_lines[k:position])
+            out.append(escape(text) if escape else text)
+            k = position
+        out.extend(component_lines[k:])
+        return out
 
     def regenerate(self, new_circuit_name=None):
+        if self.template is None:
+            self.template = CompiledTemplate(self.pre_topology, self.post_topology)
+        tpl = self.template
+
         cname = new_circuit_name if new_circuit_name else self.circuit_name
         new_topology = []
         header = f"*--- {cname} {' '.join(self.ports)} ---*"
@@ -203,177 +298,293 @@ class NetlistParser:
         
         if self.pininfo:
             new_topology.append(self.pininfo)
-            
+
+        lines = []
         for comp in self.components:
             line = ""
+            # Net IDs back to names, through the netlist's NetTable
             if isinstance(comp, Transistor):
-                d = comp.get_net('D')
-                g = comp.get_net('G')
-                s = comp.get_net('S')
-                b = comp.get_net('B')
+                d, g, s, b = comp.net_names()
                 line = f"{comp.name} {d} {g} {s} {b} {comp.type} {comp.raw_params}"
             elif isinstance(comp, Resistor):
-                 p = comp.get_net('P')
-                 n = comp.get_net('N')
+                 p, n = comp.net_names()
                  line = f"{comp.name} {p} {n} resistor {comp.raw_params}"
             elif isinstance(comp, Capacitor):
-                 p = comp.get_net('P')
-                 n = comp.get_net('N')
+                 p, n = comp.net_names()
                  line = f"{comp.name} {p} {n} capacitor {comp.raw_params}"
-            new_topology.append(line)
-            
-        # Handle Parameters Injection
-        final_pre_topology = self.pre_topology
-        
-        # 1. Parse existing parameters line
-        lines = final_pre_topology.split('\n')
-        new_lines = []
-        
-        all_params = {}
-        other_params_order = [] 
-        
-        existing_param_line_idx = -1
-        
+            lines.append(line)
+        new_topology.extend(self._body_lines(lines))
+
+        save_cmd = None
+        if tpl.has_save_slot:
+            # Base save list + operating points for ALL valid transistors, built in one join
+            save_cmd = "save V0:p Voutp Vinp Vinn" + "".join(
+                f" {c.name}:gm {c.name}:vgs {c.name}:vds {c.name}:ids {c.name}:region"
+                for c in self.components if isinstance(c, Transistor))
+
+        return tpl.render(new_topology, self._render_parameter_line(tpl), save_cmd)
+
+    def _render_parameter_line(self, tpl):
+        params = self.params
+        base = tpl.base_params
+        # 1. Existing parameters (tokenized once in CompiledTemplate), then added non-series ones
+        parts = [f"{k}={params.values.get(k, base[k])}" for k in tpl.base_other_order]
+        parts.extend(f"{k}={v}" for k, v in params.values.items()
+                     if k[:2] not in PARAM_PREFIXES and k not in base)
+
+        # 2. nA, nB, nR, nC: only the names some component still references, already sorted;
+        #    added ones are left as {{name}} placeholders
+        for prefix in PARAM_PREFIXES:
+            for k in params.used[prefix]:
+                if k in params.values:
+                    parts.append(f"{k}={{{{{k}}}}}")
+                elif k in base:
+                    parts.append(f"{k}={base[k]}")
+
+        # 3. Reconstruct Parameter String (None leaves the source text untouched)
+        if not parts:
+            return None
+        return "parameters " + " ".join(parts)
+
+class CompiledTemplate:
+    # pre/post-topology text split once into static chunks around three slots:
+    # the parameters line, the topology body and the save command.
+    def __init__(self, pre_topology, post_topology):
+        self.pre_topology = pre_topology
+        self.post_topology = post_topology
+
+        # Parameters slot: first line starting with 'parameters '
+        lines = pre_topology.split('\n')
+        self.has_param_line = False
+        self.pre_head = pre_topology
+        self.pre_tail = ""
+        self.base_params = {}
+        self.base_other_order = []
         for idx, line in enumerate(lines):
             if line.strip().startswith('parameters '):
-                existing_param_line_idx = idx
-                content = line.strip()[11:]
-                tokens = content.split()
-                for t in tokens:
+                self.has_param_line = True
+                self.pre_head = "\n".join(lines[:idx]) + ("\n" if idx > 0 else "")
+                self.pre_tail = ("\n" if idx < len(lines) - 1 else "") + "\n".join(lines[idx + 1:])
+                for t in line.strip()[11:].split():
                     if '=' in t:
                         k, v = t.split('=', 1)
-                        if k not in all_params:
-                             all_params[k] = v
+                        if k not in self.base_params:
+                             self.base_params[k] = v
                              if not (k.startswith('nA') or k.startswith('nB')):
-                                 other_params_order.append(k)
+                                 self.base_other_order.append(k)
                 break
-        
-        # 2. Merge new parameters
-        if self.new_parameters:
-             for k, v in self.new_parameters.items():
-                 if k.startswith('nA') or k.startswith('nB') or k.startswith('nR') or k.startswith('nC'):
-                      all_params[k] = f"{{{{{k}}}}}"
-                 else:
-                      all_params[k] = v
-                      if k not in other_params_order:
-                           other_params_order.append(k)
-                           
-        # 3. Identify USED nA/nB/nR/nC parameters
-        used_keys = set()
-        for comp in self.components:
-             # Scan raw_params for nA... or nB... or nR... or nC...
-             # Tokens could be l=nA1, nfin=nB2, or just values
-             if not comp.raw_params: continue
-             tokens = comp.raw_params.replace('=', ' ').split()
-             for t in tokens:
-                  if t.startswith('nA') or t.startswith('nB') or t.startswith('nR') or t.startswith('nC'):
-                       # It might be nA1 or nA1) or nA1} etc (unlikely but safe to strip)
-                       # Basic cleaning
-                       clean_t = "".join([c for c in t if c.isalnum()])
-                       if clean_t in all_params:
-                            used_keys.add(clean_t)
-                            
-        # 4. Sort nA, nB, nR, nC (ONLY USED ONES)
-        nA_keys = [k for k in all_params.keys() if k.startswith('nA') and k in used_keys]
-        nB_keys = [k for k in all_params.keys() if k.startswith('nB') and k in used_keys]
-        nR_keys = [k for k in all_params.keys() if k.startswith('nR') and k in used_keys]
-        nC_keys = [k for k in all_params.keys() if k.startswith('nC') and k in used_keys]
-        
-        def sort_key(k):
-            try:
-                return int(k[2:])
-            except ValueError:
-                return 999999
-                
-        nA_keys = sorted(nA_keys, key=sort_key)
-        nB_keys = sorted(nB_keys, key=sort_key)
-        nR_keys = sorted(nR_keys, key=sort_key)
-        nC_keys = sorted(nC_keys, key=sort_key)
-        
-        # 5. Reconstruct Parameter String
-        new_param_parts = []
-        for k in other_params_order:
-             new_param_parts.append(f"{k}={all_params[k]}")
-             
-        for k in nA_keys:
-             new_param_parts.append(f"{k}={all_params[k]}")
-             
-        for k in nB_keys:
-             new_param_parts.append(f"{k}={all_params[k]}")
-
-        for k in nR_keys:
-             new_param_parts.append(f"{k}={all_params[k]}")
-
-        for k in nC_keys:
-             new_param_parts.append(f"{k}={all_params[k]}")
-             
-        if new_param_parts:
-             new_param_line = "parameters " + " ".join(new_param_parts)
-             if existing_param_line_idx != -1:
-                  lines[existing_param_line_idx] = new_param_line
-             else:
-                  # Inject before topology if no parameters line existed
-                  lines.append(new_param_line)
-             
-        final_pre_topology = "\n".join(lines)
 
-        # Handle Save Command Update
-        final_post_topology = self.post_topology
-        if "save V0:p" in final_post_topology:
-            # Find all transistors in current component list
-            transistors = [c for c in self.components if isinstance(c, Transistor)]
-            
-            # Base save list
-            save_cmd = "save V0:p Voutp Vinp Vinn"
-            
-            # Append transistor operating points for ALL valid transistors
-            for t in transistors:
-                save_cmd += f" {t.name}:gm {t.name}:vgs {t.name}:vds {t.name}:ids {t.name}:region"
-            
-            # Replace existing save line
-            lines = final_post_topology.split('\n')
-            new_lines = []
-            for l in lines:
+        # Save slot(s): 'save ... V0:p ...' lines in the testbench
+        self.has_save_slot = "save V0:p" in post_topology
+        self.post_parts = [post_topology]
+        if self.has_save_slot:
+            parts = []
+            for idx, l in enumerate(post_topology.split('\n')):
+                sep = "\n" if idx > 0 else ""
                 if l.strip().startswith('save ') and 'V0:p' in l:
-                    new_lines.append(save_cmd)
+                    parts.extend([sep, None])
                 else:
-                    new_lines.append(l)
-            final_post_topology = "\n".join(new_lines)
-            
-        return final_pre_topology + "\n".join(new_topology) + "\n\n" + final_post_topology
+                    parts.append(sep + l)
+            # Merge runs of static text so rendering is a single short join
+            self.post_parts = []
+            for part in parts:
+                if part is not None and self.post_parts and self.post_parts[-1] is not None:
+                    self.post_parts[-1] += part
+                else:
+                    self.post_parts.append(part)
+
+    def render(self, topology_lines, param_line, save_cmd):
+        out = []
+        if param_line is None:
+            out.append(self.pre_topology)
+        elif self.has_param_line:
+            out.extend((self.pre_head, param_line, self.pre_tail))
+        else:
+            # No parameters line in the source: appended after the pre-topology text
+            out.extend((self.pre_topology, "\n", param_line))
+        out.append("\n".join(topology_lines))
+        out.append("\n\n")
+        if save_cmd is None:
+            out.append(self.post_topology)
+        else:
+            out.extend(save_cmd if part is None else part for part in self.post_parts)
+        return "".join(out)
 
 class CircuitGraph:
+    # Bipartite component/net graph kept as two insertion-ordered indexes, patched in place by
+    # Component.connect. Iteration orders are part of the seeded behaviour (they feed rng choices):
+    # nets are listed in the order they (re)appeared, and a net's components in the order their
+    # first terminal landed on it. A component with several terminals on one net is one edge.
     def __init__(self, components):
         self.components = components
-        self.graph = nx.Graph()
+        # Live net -> {(component, terminal): None} index, kept current by Component.connect
+        self.net_terminals = {}
+        # Live net -> {component: number of its terminals on net} (the graph's adjacency)
+        self.net_components = {}
+        # component -> position in the netlist, used to recover netlist order from the index
+        self.positions = {}
         self._build_graph()
-        
+
     def _build_graph(self):
-        self.graph.clear()
+        self.net_terminals = {}
+        self.net_components = {}
+        self.positions = {}
         for comp in self.components:
-            self.graph.add_node(comp, type='component', obj=comp)
-            for terminal, net in comp.connections.items():
-                if not self.graph.has_node(net):
-                    self.graph.add_node(net, type='net')
-                self.graph.add_edge(comp, net, terminal=terminal)
-                
+            self._index_component(comp)
+
+    def _index_component(self, comp):
+        comp.graph = self
+        self.positions[comp] = len(self.positions)
+        for terminal, net in comp.connections():
+            self.net_terminals.setdefault(net, {})[(comp, terminal)] = None
+            comps = self.net_components.setdefault(net, {})
+            comps[comp] = comps.get(comp, 0) + 1
+
+    def add_component(self, comp):
+        # Appends a new component to the netlist and adds it to the index
+        self.components.append(comp)
+        self._index_component(comp)
+
+    def on_connect(self, comp, terminal, old_net, new_net):
+        # Patches both indexes in place for a single terminal move
+        if old_net == new_net:
+            return
+        if old_net is not None:
+            terms = self.net_terminals.get(old_net)
+            if terms is not None:
+                terms.pop((comp, terminal), None)
+                if not terms:
+                    del self.net_terminals[old_net]
+            comps = self.net_components.get(old_net)
+            if comps is not None and comp in comps:
+                if comps[comp] > 1:
+                    comps[comp] -= 1
+                else:
+                    del comps[comp]
+                    if not comps:
+                        del self.net_components[old_net]
+        self.net_terminals.setdefault(new_net, {})[(comp, terminal)] = None
+        comps = self.net_components.setdefault(new_net, {})
+        comps[comp] = comps.get(comp, 0) + 1
+
+    def components_on(self, net):
+        # Components with at least one terminal on net (the net's neighbours)
+        return list(self.net_components.get(net, ()))
+
+    def terminals_on(self, net):
+        # Snapshot of (component, terminal) pairs on net, safe to iterate while reconnecting
+        return list(self.net_terminals.get(net, ()))
+
+    def terminal_order(self, item):
+        # Sort key giving the netlist order (component, then terminal) of an index entry
+        comp, terminal = item
+        return (self.positions[comp], comp.INDEX[terminal])
+
+    def rename_net(self, old_net, new_net):
+        # Moves every terminal on old_net to new_net in O(degree)
+        for comp, terminal in self.terminals_on(old_net):
+            comp.connect(terminal, new_net)
+
     def get_nets(self):
-        return [n for n, d in self.graph.nodes(data=True) if d.get('type') == 'net']
+        return list(self.net_terminals)
+
+    def to_networkx(self):
+        # networkx.Graph view (component and net nodes, edges labelled with the component's last
+        # terminal on the net) for ad-hoc analyses; networkx is only imported here
+        import networkx as nx
+        g = nx.Graph()
+        for comp in self.components:
+            g.add_node(comp, type='component', obj=comp)
+        for net, terms in self.net_terminals.items():
+            g.add_node(net, type='net')
+            for comp, terminal in terms:
+                g.add_edge(comp, net, terminal=comp.terminals_on(net)[-1])
+        return g
+
+    def verify(self):
+        # Consistency check: compare the incrementally maintained indexes against a full
+        # rebuild from the component list
+        fresh_terminals = {}
+        fresh_components = {}
+        for comp in self.components:
+            for terminal, net in comp.connections():
+                fresh_terminals.setdefault(net, set()).add((comp, terminal))
+                comps = fresh_components.setdefault(net, {})
+                comps[comp] = comps.get(comp, 0) + 1
+
+        if {n: set(t) for n, t in self.net_terminals.items()} != fresh_terminals:
+            raise RuntimeError("Net-terminal index out of sync with component connections")
+        if self.net_components != fresh_components:
+            raise RuntimeError("Incremental graph out of sync: net adjacency differs")
+        if list(self.net_components) != list(self.net_terminals):
+            raise RuntimeError("Incremental graph out of sync: net order differs")
+
+def task_rng(master_seed, task_index, bit):
+    # Counter-based derivation: the stream for (seed, task, bit) is a pure function of those
+    # three values, so any artifact can be regenerated without replaying earlier tasks or bits
+    key = hashlib.blake2b(f"{master_seed}:{task_index}:{bit}".encode(), digest_size=16).digest()
+    return random.Random(int.from_bytes(key, 'big'))
+
+# Target selection shared with batch_injector.RelabelEngine. The relabel replay only matches the
+# scalar injector if both build the same candidate lists in the same order and make the same rng
+# calls, so both paths draw through these helpers.
+def pick_targets(rng, candidates):
+    # 1 to len(candidates) distinct candidates, in sampled order
+    if not candidates: return []
+    count = rng.randint(1, len(candidates))
+    return rng.sample(candidates, count)
+
+def pick_short_pairs(rng, nets):
+    # (kept, shorted) net pairs for ERROR_IDEAL_SHORT, up to a quarter of the nets; drawn lazily,
+    # so the caller may rename nets between pairs
+    if len(nets) < 2: return
+    count = rng.randint(1, max(1, len(nets)//4))
+    for _ in range(count):
+        n1, n2 = rng.sample(nets, 2)
+        if n1 == n2: continue
+        yield n1, n2
+
+def transistor_indices(components):
+    # Positions of the transistors in component order (the candidates of per-transistor faults)
+    return [k for k, c in enumerate(components) if isinstance(c, Transistor)]
 
 class ErrorInjector:
-    def __init__(self, parser):
+    def __init__(self, parser, seed=None, task_index=0, check_consistency=False, verbose=True, events=None, profile=None):
         self.parser = parser
+        # Human-readable per-fault output, and/or structured fault events appended to `events` as
+        # (task_index, bit, kind, component, terminal, old, new). old/new are nets for
+        # connectivity faults and types/parameter values for parametric ones.
+        self.verbose = verbose
+        self.events = events
+        self.bit = None
+        # With a seed, inject() gives every error bit its own stream from task_rng(seed, task_index, bit)
+        self.seed = seed
+        self.task_index = task_index
+        self.rng = random.Random(seed)
+        # Optional list of profiler.stage samples; None keeps the per-bit hooks no-ops
+        self.profile = profile
         self.components = parser.components
+        self.params = parser.params
         self.graph = CircuitGraph(self.components)
+        # The graph is patched in place on every connect; a full rebuild only runs as a cross-check
+        self.check_consistency = check_consistency
+        self._seed_net_allocator()
         
-    def _rebuild_graph(self):
-        self.graph = CircuitGraph(self.components)
+    def _log(self, kind, message=None, component=None, terminal=None, old=None, new=None):
+        if self.verbose and message is not None:
+            print(message)
+        if self.events is not None:
+            self.events.append((self.task_index, self.bit, kind, component, terminal, old, new))
+
+    def _check_graph(self):
+        if self.check_consistency:
+            with stage(self.profile, 'check_graph'):
+                self.graph.verify()
         
-    def _get_new_net_name(self):
-        # Find highest net{N}
+    def _seed_net_allocator(self):
+        # Find highest net{N} once; _get_new_net_name then counts up from it
         max_n = 0
-        existing_nets = self.graph.get_nets()
-        for net in existing_nets:
+        for net in list(self.graph.net_terminals) + list(self.parser.ports) + self.parser.passthrough_nets:
             if net.startswith("net"):
                 try:
                     val = int(net[3:])
@@ -381,31 +592,40 @@ class ErrorInjector:
                         max_n = val
                 except ValueError:
                     pass
-        return f"net{max_n + 1}"
+        self.next_net = max_n + 1
+
+    def _get_new_net_name(self):
+        # O(1): every name handed out is above any net present in the parsed netlist
+        # and above every name handed out before, so it can never collide
+        name = f"net{self.next_net}"
+        self.next_net += 1
+        return name
 
     def _add_param(self, name_hint, value):
         # Legacy/Generic param adder
-        idx = len(self.parser.new_parameters)
+        idx = len(self.params.values)
         pname = f"pfault_{name_hint}_{idx}"
-        self.parser.add_parameter(pname, value)
+        self.params.add(pname, value)
         return pname
 
     def _add_geometry_param(self, param_type, value):
         # Specific adder for nA/nB series
         if param_type == 'l':
-            pname = self.parser.get_next_param_name('nA')
+            return self.params.new('nA', value)
         elif param_type == 'nfin' or param_type == 'w':
-            pname = self.parser.get_next_param_name('nB')
+            return self.params.new('nB', value)
         else:
             return self._add_param(param_type, value)
-            
-        self.parser.add_parameter(pname, value)
-        return pname
 
-    def _update_param(self, existing_params, key, new_val_name):
+    def _add_component(self, comp):
+        # Inserted devices join the graph and count towards the parameters they reference
+        self.graph.add_component(comp)
+        self.params.retain(comp.raw_params)
+
+    def _update_param(self, comp, key, new_val_name):
         # Replaces key=old_val with key=new_val_name
         # Or appends key=new_val_name if not found
-        tokens = existing_params.split()
+        tokens = comp.raw_params.split()
         new_tokens = []
         found = False
         
@@ -418,8 +638,10 @@ class ErrorInjector:
                 
         if not found:
             new_tokens.append(f"{key}={new_val_name}")
-            
-        return " ".join(new_tokens)
+
+        self.params.release(comp.raw_params)
+        comp.raw_params = " ".join(new_tokens)
+        self.params.retain(comp.raw_params)
 
     def inject(self, error_vector):
         error_map = {
@@ -443,27 +665,34 @@ class ErrorInjector:
         
         for bit, func in error_map.items():
             if (error_vector >> bit) & 1:
-                print(f"Injecting Error Bit {bit} (ID {240+bit})")
+                self.bit = bit
+                if self.verbose:
+                    print(f"Injecting Error Bit {bit} (ID {240+bit})")
+                if self.seed is not None:
+                    self.rng = task_rng(self.seed, self.task_index, bit)
                 try:
-                    func()
+                    with stage(self.profile, f"bit {bit:>2} ({240 + bit})"):
+                        func()
                 except Exception as e:
-                    print(f"Failed to inject error {240+bit}: {e}")
+                    self._log('inject_failed', f"Failed to inject error {240+bit}: {e}", new=str(e))
 
     # Helper for multi-injection
     def _get_random_targets(self, candidates):
-        if not candidates: return []
         # Random number of targets: 1 to len(candidates)
-        count = random.randint(1, len(candidates))
-        return random.sample(candidates, count)
+        return pick_targets(self.rng, candidates)
+
+    def _transistors(self):
+        return [self.components[k] for k in transistor_indices(self.components)]
 
     # 240
     def error_non_modal(self):
-        comps = [c for c in self.components if isinstance(c, Transistor)]
+        comps = self._transistors()
         targets = self._get_random_targets(comps)
         for c in targets:
+            old_type = c.type
             new_type = 'nfet' if c.type == 'pfet' else 'pfet'
             c.type = new_type
-            print(f"  Non-Modal Error: Swapped {c.name} type to {new_type}")
+            self._log('non_modal', f"  Non-Modal Error: Swapped {c.name} type to {new_type}", c.name, None, old_type, new_type)
 
     # 241
     def error_source_absent(self):
@@ -472,21 +701,17 @@ class ErrorInjector:
         
         target_nets = self._get_random_targets(bias_nets)
         for target_net in target_nets:
-            connected_comps = []
-            for n, neighbors in self.graph.graph.adj.items():
-                if n == target_net:
-                    for comp in neighbors:
-                        connected_comps.append(comp)
+            connected_comps = self.graph.components_on(target_net)
             
             if connected_comps:
                 targets = self._get_random_targets(connected_comps)
                 for comp in targets:
                     new_net = self._get_new_net_name()
-                    terms_to_break = [t for t, n in comp.connections.items() if n == target_net]
+                    terms_to_break = comp.terminals_on(target_net)
                     for t in terms_to_break:
                         comp.connect(t, new_net)
-                        print(f"  Source Absent: Disconnected {target_net} from {comp.name}:{t} to {new_net}")
-                self._rebuild_graph()
+                        self._log('source_absent', f"  Source Absent: Disconnected {target_net} from {comp.name}:{t} to {new_net}", comp.name, t, target_net, new_net)
+                self._check_graph()
 
     # 242 - COMPONENT REMOVAL (BYPASS)
     def error_galvanic_island(self):
@@ -497,7 +722,7 @@ class ErrorInjector:
                 # Short Drain to Source
                 d = comp.get_net('D')
                 s = comp.get_net('S')
-                print(f"  Component Removal: Bypassing {comp.name} (Shorting {d} to {s})")
+                self._log('bypass', f"  Component Removal: Bypassing {comp.name} (Shorting {d} to {s})", comp.name, None, d, s)
                 
                 # Perform the short
                 if d != s:
@@ -505,44 +730,40 @@ class ErrorInjector:
                 
                 # Now effectively remove the component by disconnecting all terminals
                 for term in comp.terminals:
-                    comp.connect(term, self._get_new_net_name())
+                    self._float_terminal(comp, term)
             
             elif isinstance(comp, (Resistor, Capacitor)):
                 # Short P to N
                 p = comp.get_net('P')
                 n = comp.get_net('N')
-                print(f"  Component Removal: Bypassing {comp.name} (Shorting {p} to {n})")
+                self._log('bypass', f"  Component Removal: Bypassing {comp.name} (Shorting {p} to {n})", comp.name, None, p, n)
                 if p != n:
                     self._short_nets(p, n)
                 
                 for term in comp.terminals:
-                    comp.connect(term, self._get_new_net_name())
+                    self._float_terminal(comp, term)
 
-        self._rebuild_graph()
+        self._check_graph()
+
+    def _float_terminal(self, comp, term):
+        # Disconnects a removed component's terminal onto its own fresh net
+        old_net = comp.get_net(term)
+        new_net = self._get_new_net_name()
+        comp.connect(term, new_net)
+        self._log('float', None, comp.name, term, old_net, new_net)
 
     def _short_nets(self, net1, net2):
         # Move all connections from net1 to net2
-        for c in self.components:
-            for t, n in c.connections.items():
-                if n == net1:
-                    c.connect(t, net2)
+        self.graph.rename_net(net1, net2)
 
     # 243
     def error_ideal_short(self):
-        nets = self.graph.get_nets()
-        if len(nets) < 2: return
-        count = random.randint(1, max(1, len(nets)//4))
-        for _ in range(count):
-            if len(nets) < 2: break
-            n1, n2 = random.sample(nets, 2)
-            if n1 == n2: continue
-            print(f"  Ideal Short: Shorting {n2} to {n1}")
-            for comp in self.components:
-                for t, net in comp.connections.items():
-                    if net == n2:
-                        comp.connect(t, n1)
-            # Update nets list? simple way is just proceed, redundancy is fine
-            self._rebuild_graph()
+        # Pairs are drawn from the nets before any short; later pairs may name an already
+        # shorted net, which is fine
+        for n1, n2 in pick_short_pairs(self.rng, self.graph.get_nets()):
+            self._log('short', f"  Ideal Short: Shorting {n2} to {n1}", None, None, n2, n1)
+            self.graph.rename_net(n2, n1)
+            self._check_graph()
 
     # 244
     def error_ideal_open(self):
@@ -550,11 +771,11 @@ class ErrorInjector:
         for comp in targets:
             term_targets = self._get_random_targets(comp.terminals)
             for term in term_targets:
-                old_net = comp.connections.get(term)
+                old_net = comp.get_net(term)
                 new_net = self._get_new_net_name()
                 comp.connect(term, new_net)
-                print(f"  Ideal Open: Opened {comp.name}:{term} (was {old_net}, now {new_net})")
-        self._rebuild_graph()
+                self._log('open', f"  Ideal Open: Opened {comp.name}:{term} (was {old_net}, now {new_net})", comp.name, term, old_net, new_net)
+        self._check_graph()
 
     # 245
     def error_kcl_conflict(self):
@@ -562,23 +783,21 @@ class ErrorInjector:
         nets = self.graph.get_nets()
         targets = self._get_random_targets(nets)
         for t_net in targets:
-            conflict_net = 'vdd!' if random.random() > 0.5 else 'gnd!'
-            print(f"  KCL Conflict: Shorting {t_net} to {conflict_net}")
-            for comp in self.components:
-                 for t, net in comp.connections.items():
-                    if net == t_net:
-                        comp.connect(t, conflict_net)
-        self._rebuild_graph()
+            conflict_net = 'vdd!' if self.rng.random() > 0.5 else 'gnd!'
+            self._log('kcl_conflict', f"  KCL Conflict: Shorting {t_net} to {conflict_net}", None, None, t_net, conflict_net)
+            self.graph.rename_net(t_net, conflict_net)
+        self._check_graph()
 
     # 246
     def error_kvl_conflict(self):
-        comps = [c for c in self.components if isinstance(c, Transistor)]
+        comps = self._transistors()
         targets = self._get_random_targets(comps)
         for c in targets:
+            net_d = c.get_net('D')
             net_s = c.get_net('S')
             c.connect('D', net_s)
-            print(f"  KVL Conflict: Shorted D-S of {c.name}")
-        self._rebuild_graph()
+            self._log('kvl_conflict', f"  KVL Conflict: Shorted D-S of {c.name}", c.name, 'D', net_d, net_s)
+        self._check_graph()
 
     # 247
     def error_port_dangling(self):
@@ -586,12 +805,9 @@ class ErrorInjector:
         targets = self._get_random_targets(self.parser.ports)
         for port in targets:
             new_net = self._get_new_net_name()
-            print(f"  Dangling Port: Disconnecting internals from {port} to {new_net}")
-            for comp in self.components:
-                for t, net in comp.connections.items():
-                    if net == port:
-                        comp.connect(t, new_net)
-        self._rebuild_graph()
+            self._log('port_dangling', f"  Dangling Port: Disconnecting internals from {port} to {new_net}", None, None, port, new_net)
+            self.graph.rename_net(port, new_net)
+        self._check_graph()
 
     # Warnings
     def warning_bias_path(self):
@@ -604,15 +820,17 @@ class ErrorInjector:
         if diode_connected:
             targets = self._get_random_targets(diode_connected)
             for c in targets:
-                print(f"  Bias Path Warning: Shorted diode-connected {c.name} G/D to gnd!")
+                old_net = c.get_net('G')
+                self._log('bias_path', f"  Bias Path Warning: Shorted diode-connected {c.name} G/D to gnd!", c.name, 'G', old_net, 'gnd!')
+                self._log('bias_path', None, c.name, 'D', old_net, 'gnd!')
                 c.connect('G', 'gnd!')
                 c.connect('D', 'gnd!')
-            self._rebuild_graph()
+            self._check_graph()
         else:
             self.error_source_absent() # Already randomized
 
     def warning_symmetry(self):
-        comps = [c for c in self.components if isinstance(c, Transistor)]
+        comps = self._transistors()
         if not comps: return
         
         all_param_values = []
@@ -629,8 +847,8 @@ class ErrorInjector:
             for c in targets:
                 # Use geometry param
                 p_m = self._add_geometry_param('m', 2) # m is not geometry strictly, but uses default
-                c.raw_params = self._update_param(c.raw_params, 'm', p_m)
-                print(f"  Symmetry Warning (Fallback): Modified {c.name} with m={p_m}")
+                self._update_param(c, 'm', p_m)
+                self._log('symmetry', f"  Symmetry Warning (Fallback): Modified {c.name} with m={p_m}", c.name, 'm', None, p_m)
             return
 
         targets = self._get_random_targets(comps)
@@ -643,7 +861,7 @@ class ErrorInjector:
                     candidates.append((i, k, v))
             
             if candidates:
-                idx, k, v = random.choice(candidates)
+                idx, k, v = self.rng.choice(candidates)
                 options = [val for val in all_param_values if val != v]
                 
                 # Determine param type for geometry prefix
@@ -655,95 +873,90 @@ class ErrorInjector:
                      pass
                 
                 if options:
-                    new_val = random.choice(options)
+                    new_val = self.rng.choice(options)
                     
                     if k == 'l' or k == 'nfin':
                          p_scramble = self._add_geometry_param(k, new_val)
                     else:
                          p_scramble = self._add_param(f'sym_{k}', new_val)
                          
-                    c.raw_params = self._update_param(c.raw_params, k, p_scramble)
-                    print(f"  Symmetry Warning: Scrambled {c.name} {k}={v} to {k}={p_scramble}")
+                    self._update_param(c, k, p_scramble)
+                    self._log('symmetry', f"  Symmetry Warning: Scrambled {c.name} {k}={v} to {k}={p_scramble}", c.name, k, v, p_scramble)
                 else:
                      p_m = self._add_param('sym_m', 2)
-                     c.raw_params = self._update_param(c.raw_params, 'm', p_m)
-                     print(f"  Symmetry Warning (Fallback): Modified {c.name} with m={p_m}")
+                     self._update_param(c, 'm', p_m)
+                     self._log('symmetry', f"  Symmetry Warning (Fallback): Modified {c.name} with m={p_m}", c.name, 'm', None, p_m)
             else:
                  p_m = self._add_param('sym_m', 2)
-                 c.raw_params = self._update_param(c.raw_params, 'm', p_m)
-                 print(f"  Symmetry Warning (Fallback): Modified {c.name} with m={p_m}")
+                 self._update_param(c, 'm', p_m)
+                 self._log('symmetry', f"  Symmetry Warning (Fallback): Modified {c.name} with m={p_m}", c.name, 'm', None, p_m)
 
     def warning_loop_phase(self):
         # Approach 1: Global Swap (50% chance)
-        if random.random() > 0.5:
+        if self.rng.random() > 0.5:
             if 'Vinp' in self.parser.ports and 'Vinn' in self.parser.ports:
-                print("  Loop Phase Warning: Swapping Vinp and Vinn")
-                for comp in self.components:
-                    replacements = {}
-                    for t, net in comp.connections.items():
-                        if net == 'Vinp':
-                            replacements[t] = 'Vinn'
-                        elif net == 'Vinn':
-                            replacements[t] = 'Vinp'
-                    for t, new_net in replacements.items():
-                        comp.connect(t, new_net)
+                self._log('input_swap', "  Loop Phase Warning: Swapping Vinp and Vinn", None, None, 'Vinp', 'Vinn')
+                vinp_terms = self.graph.terminals_on('Vinp')
+                vinn_terms = self.graph.terminals_on('Vinn')
+                for comp, t in vinp_terms:
+                    comp.connect(t, 'Vinn')
+                for comp, t in vinn_terms:
+                    comp.connect(t, 'Vinp')
         
         # Approach 2: Local G-D Swaps (Random transistors)
-        comps = [c for c in self.components if isinstance(c, Transistor)]
+        comps = self._transistors()
         targets = self._get_random_targets(comps)
         for comp in targets:
             g = comp.get_net('G')
             d = comp.get_net('D')
             comp.connect('G', d)
             comp.connect('D', g)
-            print(f"  Loop Phase Warning: Swapped G-D on {comp.name}")
-        self._rebuild_graph()
+            self._log('gd_swap', f"  Loop Phase Warning: Swapped G-D on {comp.name}", comp.name, 'G', g, d)
+            self._log('gd_swap', None, comp.name, 'D', d, g)
+        self._check_graph()
 
     def warning_impedance(self):
         # Add random number of low resistance paths
-        count = random.randint(1, 5)
+        count = self.rng.randint(1, 5)
         for _ in range(count):
-            target_net = random.choice(self.graph.get_nets())
+            target_net = self.rng.choice(self.graph.get_nets())
             # Use nR parameter
-            p_res = self.parser.get_next_param_name('nR')
-            self.parser.add_parameter(p_res, 1) # Value is template anyway, but need to register it
+            p_res = self.params.new('nR', 1) # Value is template anyway, but need to register it
             
-            new_res = Resistor(f"R_fault_{random.randint(0,999)}", raw_params=f"r={p_res}")
+            new_res = Resistor(f"R_fault_{self.rng.randint(0,999)}", raw_params=f"r={p_res}", table=self.parser.nets)
             new_res.connect('P', target_net)
             new_res.connect('N', 'gnd!')
-            self.components.append(new_res)
-            print(f"  Impedance Warning: Added {p_res} (1 Ohm) resistor from {target_net} to gnd!")
-        self._rebuild_graph()
+            self._add_component(new_res)
+            self._log('impedance', f"  Impedance Warning: Added {p_res} (1 Ohm) resistor from {target_net} to gnd!", new_res.name, 'P', None, target_net)
+        self._check_graph()
 
     def warning_stack(self):
-        candidates = []
-        for c in self.components:
-            if isinstance(c, Transistor):
-                s_net = c.get_net('S')
-                neighbors = self.graph.graph[s_net]
-                for n in neighbors:
-                    if isinstance(n, Transistor) and n != c:
-                        edge_data = self.graph.graph.get_edge_data(n, s_net)
-                        if edge_data and edge_data.get('terminal') == 'D':
-                            candidates.append(c)
-                            break
+        # A cascode device's source sits on a net that another transistor drives with its drain
+        # only (no G/S/B of that transistor on the same net); one pass collects those nets
+        transistors = self._transistors()
+        drain_nets = set()
+        for n in transistors:
+            d_net = n.get_net('D')
+            if d_net is not None and n.terminals_on(d_net) == ['D']:
+                drain_nets.add(d_net)
+        candidates = [c for c in transistors if c.get_net('S') in drain_nets]
         
         targets = self._get_random_targets(candidates)
         if targets:
             for c in targets:
-                print(f"  Stack Warning: Shorting Cascode Device {c.name} (D-S)")
+                self._log('stack', f"  Stack Warning: Shorting Cascode Device {c.name} (D-S)", c.name, 'D', c.get_net('D'), c.get_net('S'))
                 c.connect('D', c.get_net('S'))
-            self._rebuild_graph()
+            self._check_graph()
         else:
             self.error_kvl_conflict()
 
     def warning_steering(self):
-        comps = [c for c in self.components if isinstance(c, Transistor)]
+        comps = self._transistors()
         targets = self._get_random_targets(comps)
         for c in targets:
             p_nfin = self._add_geometry_param('nfin', 1)
-            c.raw_params = self._update_param(c.raw_params, 'nfin', p_nfin)
-            print(f"  Steering Warning: Set nfin={p_nfin} on {c.name}")
+            self._update_param(c, 'nfin', p_nfin)
+            self._log('steering', f"  Steering Warning: Set nfin={p_nfin} on {c.name}", c.name, 'nfin', None, p_nfin)
 
     # 254 - COMPONENT INSERTION (Series & Random)
     def warning_isolation(self):
@@ -751,29 +964,26 @@ class ErrorInjector:
         # e.g., 1 to 1/3 of component count, minimum 1
         n_comps = len(self.components)
         max_insertions = max(1, n_comps // 3)
-        count = random.randint(1, max_insertions)
+        count = self.rng.randint(1, max_insertions)
         
-        print(f"  Insertion Warning: Injecting {count} extra components...")
+        if self.verbose:
+            print(f"  Insertion Warning: Injecting {count} extra components...")
 
         for _ in range(count):
-             mode = random.choices(['series', 'random'], weights=[0.6, 0.4])[0]
+             mode = self.rng.choices(['series', 'random'], weights=[0.6, 0.4])[0]
              
              if mode == 'series':
                  # Series Insertion: Pick a net, split it, insert component
                  nets = self.graph.get_nets()
-                 target_net = random.choice(nets)
+                 target_net = self.rng.choice(nets)
                  
-                 # Find components connected to this net
-                 connected_terminals = []
-                 for c in self.components:
-                     for t, n in c.connections.items():
-                         if n == target_net:
-                             connected_terminals.append((c, t))
+                 # Find components connected to this net (netlist order keeps the seeded shuffle stable)
+                 connected_terminals = sorted(self.graph.terminals_on(target_net), key=self.graph.terminal_order)
                  
                  if not connected_terminals: continue
                  
-                 random.shuffle(connected_terminals)
-                 split_point = random.randint(1, len(connected_terminals))
+                 self.rng.shuffle(connected_terminals)
+                 split_point = self.rng.randint(1, len(connected_terminals))
                  if len(connected_terminals) > 1:
                      split_point = len(connected_terminals) // 2
                  
@@ -784,71 +994,70 @@ class ErrorInjector:
                  new_net_prime = self._get_new_net_name()
                  for c, t in moved_contacts:
                      c.connect(t, new_net_prime)
+                     self._log('split', None, c.name, t, target_net, new_net_prime)
                      
                  # Insert Component bridging target_net and new_net_prime
-                 comp_type = random.choice(['res', 'cap', 'mos'])
+                 comp_type = self.rng.choice(['res', 'cap', 'mos'])
                  
                  if comp_type == 'res':
-                     name = f"R_ins_{random.randint(0,9999)}"
-                     p_val = self.parser.get_next_param_name('nR')
-                     self.parser.add_parameter(p_val, '1k')
+                     name = f"R_ins_{self.rng.randint(0,9999)}"
+                     p_val = self.params.new('nR', '1k')
                      
-                     new_comp = Resistor(name, raw_params=f"r={p_val}")
+                     new_comp = Resistor(name, raw_params=f"r={p_val}", table=self.parser.nets)
                      new_comp.connect('P', target_net)
                      new_comp.connect('N', new_net_prime)
-                     print(f"  Insertion (Series): Added {name} into {target_net}")
                      
                  elif comp_type == 'cap':
-                     name = f"C_ins_{random.randint(0,9999)}"
-                     p_val = self.parser.get_next_param_name('nC')
-                     self.parser.add_parameter(p_val, '100f')
+                     name = f"C_ins_{self.rng.randint(0,9999)}"
+                     p_val = self.params.new('nC', '100f')
                      
-                     new_comp = Capacitor(name, raw_params=f"c={p_val}")
+                     new_comp = Capacitor(name, raw_params=f"c={p_val}", table=self.parser.nets)
                      new_comp.connect('P', target_net)
                      new_comp.connect('N', new_net_prime)
-                     print(f"  Insertion (Series): Added {name} into {target_net}")
                      
                  elif comp_type == 'mos':
-                     name = f"M_ins_{random.randint(0,9999)}"
+                     name = f"M_ins_{self.rng.randint(0,9999)}"
                      p_l = self._add_geometry_param('l', '100n')
                      p_nf = self._add_geometry_param('nfin', '4')
-                     new_comp = Transistor(name, "nfet", raw_params=f"l={p_l} nfin={p_nf}")
+                     new_comp = Transistor(name, "nfet", raw_params=f"l={p_l} nfin={p_nf}", table=self.parser.nets)
                      # Pass gate style
                      new_comp.connect('D', target_net)
                      new_comp.connect('S', new_net_prime)
                      new_comp.connect('G', 'vdd!') # On
                      new_comp.connect('B', 'gnd!')
-                     print(f"  Insertion (Series): Added {name} (PassGate) into {target_net}")
                  
-                 self.components.append(new_comp)
+                 kind = " (PassGate)" if comp_type == 'mos' else ""
+                 self._log('insertion', f"  Insertion (Series): Added {name}{kind} into {target_net}", name, None, target_net, new_net_prime)
+                 self._add_component(new_comp)
 
              else:
                  # Random Insertion
                  nets = self.graph.get_nets()
                  if len(nets) < 4: continue
                  
-                 name = f"M_chaos_{random.randint(0,9999)}"
+                 name = f"M_chaos_{self.rng.randint(0,9999)}"
                  p_l = self._add_geometry_param('l', '100n')
                  p_nf = self._add_geometry_param('nfin', '4')
-                 new_comp = Transistor(name, "nfet", raw_params=f"l={p_l} nfin={p_nf}")
+                 new_comp = Transistor(name, "nfet", raw_params=f"l={p_l} nfin={p_nf}", table=self.parser.nets)
                  
                  # Pick 4 random nets
-                 d, g, s, b = random.sample(nets, 4)
+                 d, g, s, b = self.rng.sample(nets, 4)
                  new_comp.connect('D', d)
                  new_comp.connect('G', g)
                  new_comp.connect('S', s)
                  new_comp.connect('B', b)
                  
-                 self.components.append(new_comp)
-                 print(f"  Insertion (Random): Added {name} connected to {d}, {g}, {s}, {b}")
+                 self._add_component(new_comp)
+                 self._log('insertion', f"  Insertion (Random): Added {name} connected to {d}, {g}, {s}, {b}", name, None, None, f"{d} {g} {s} {b}")
 
-        self._rebuild_graph()
+        self._check_graph()
 
     def warning_dropout(self):
-        comps = [c for c in self.components if isinstance(c, Transistor)]
+        comps = self._transistors()
         targets = self._get_random_targets(comps)
         for c in targets:
+            old_net = c.get_net('B')
             new_net = self._get_new_net_name()
             c.connect('B', new_net)
-            print(f"  Dropout Warning: Floated Body of {c.name} to {new_net}")
-            self._rebuild_graph()
+            self._log('dropout', f"  Dropout Warning: Floated Body of {c.name} to {new_net}", c.name, 'B', old_net, new_net)
+            self._check_graph()
@@ -1,29 +1,131 @@
+class NetTable:
+    # Interns net names as small integer IDs. Each parsed template owns one table, shared by its
+    # per-task copies and the components injected into them, so it is freed together with the
+    # template (e.g. when TemplateCache evicts it). Names a task adds (net{N}, vdd!, ...) stay in
+    # the table, but every copy starts numbering from the same net{N}, so it only grows to the
+    # largest single task. IDs are local to their table; each component keeps the table it uses.
+    __slots__ = ('ids', 'names')
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def lookup(self, name):
+        # ID of an existing net name, or None if the name was never interned
+        return self.ids.get(name)
+
+UNCONNECTED = -1
+
 class Component:
-    def __init__(self, name, raw_params=""):
+    # Connectivity is a fixed array of net IDs in TERMINALS order (UNCONNECTED if unset), indexing
+    # the NetTable of the netlist the component belongs to. The graph and fault selection work on
+    # names, so connect resolves both the new and the old net name for CircuitGraph.on_connect.
+    __slots__ = ('name', 'nets', 'raw_params', 'graph', 'table')
+    TERMINALS = ()
+    INDEX = {}
+
+    def __init__(self, name, raw_params="", table=None):
         self.name = name
-        # terminal names -> ['D', 'G', 'S', 'B']
-        self.terminals = []
-        self.connections = {}
+        self.nets = [UNCONNECTED] * len(self.TERMINALS)
         self.raw_params = raw_params
+        # CircuitGraph notified of every connect (set when the component joins a graph)
+        self.graph = None
+        # Net names of the owning netlist (a private table for a standalone component)
+        self.table = table if table is not None else NetTable()
+
+    @property
+    def terminals(self):
+        # terminal names -> ('D', 'G', 'S', 'B')
+        return self.TERMINALS
 
     def connect(self, terminal, net):
-        self.connections[terminal] = net
+        i = self.INDEX[terminal]
+        old_id = self.nets[i]
+        self.nets[i] = self.table.intern(net)
+        if self.graph is not None:
+            old_net = self.table.names[old_id] if old_id != UNCONNECTED else None
+            self.graph.on_connect(self, terminal, old_net, net)
 
     def get_net(self, terminal):
-        return self.connections.get(terminal)
+        i = self.INDEX.get(terminal)
+        if i is None or self.nets[i] == UNCONNECTED:
+            return None
+        return self.table.names[self.nets[i]]
+
+    def net_names(self):
+        # All terminal nets as names, in TERMINALS order
+        names = self.table.names
+        return [names[i] if i != UNCONNECTED else None for i in self.nets]
+
+    def connections(self):
+        # (terminal, net name) pairs for connected terminals, in TERMINALS order
+        names = self.table.names
+        return [(t, names[i]) for t, i in zip(self.TERMINALS, self.nets) if i != UNCONNECTED]
+
+    def terminals_on(self, net):
+        # Terminals of this component on net, compared by ID
+        net_id = self.table.lookup(net)
+        if net_id is None:
+            return []
+        return [t for t, i in zip(self.TERMINALS, self.nets) if i == net_id]
+
+    def copy(self):
+        # Independent copy for per-task mutation; raw_params/type are plain strings
+        new = self.__class__.__new__(self.__class__)
+        new.name = self.name
+        new.nets = self.nets[:]
+        new.raw_params = self.raw_params
+        new.graph = None
+        new.table = self.table
+        return new
+
+    def __getstate__(self):
+        # The table is pickled once per netlist (pickle memoizes it), so IDs stay valid
+        return {'name': self.name, 'nets': self.nets, 'raw_params': self.raw_params, 'table': self.table}
+
+    def __setstate__(self, state):
+        self.name = state['name']
+        self.nets = state['nets']
+        self.raw_params = state['raw_params']
+        self.table = state['table']
+        self.graph = None
 
 class Transistor(Component):
-    def __init__(self, name, type_, raw_params=""):
-        super().__init__(name, raw_params)
+    __slots__ = ('type',)
+    TERMINALS = ('D', 'G', 'S', 'B')
+    INDEX = {t: i for i, t in enumerate(TERMINALS)}
+
+    def __init__(self, name, type_, raw_params="", table=None):
+        super().__init__(name, raw_params, table)
         self.type = type_
-        self.terminals = ['D', 'G', 'S', 'B']
+
+    def copy(self):
+        new = super().copy()
+        new.type = self.type
+        return new
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['type'] = self.type
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.type = state['type']
 
 class Resistor(Component):
-    def __init__(self, name, raw_params=""):
-        super().__init__(name, raw_params)
-        self.terminals = ['P', 'N']
+    __slots__ = ()
+    TERMINALS = ('P', 'N')
+    INDEX = {t: i for i, t in enumerate(TERMINALS)}
 
 class Capacitor(Component):
-    def __init__(self, name, raw_params=""):
-        super().__init__(name, raw_params)
-        self.terminals = ['P', 'N']
+    __slots__ = ()
+    TERMINALS = ('P', 'N')
+    INDEX = {t: i for i, t in enumerate(TERMINALS)}
@@ -0,0 +1,57 @@
+import os
+import random
+from collections import namedtuple
+from template_cache import TemplateCache
+from task_pipeline import RELABEL_CHUNK, iter_batch_tasks, iter_random_tasks, iter_chunks, render_chunk
+from graph_export import check_vector
+
+# In-memory generation API. Tasks are planned exactly like the CLI modes, so with the same
+# seed every netlist matches the CLI's file byte for byte (apart from the "* Date:" line) and
+# can still be regenerated with --reproduce. Nothing is written to disk.
+#
+#   from crucible import iter_variants
+#   for v in iter_variants("ota.scs", [0b1000, 0xFFFF], seed=42, count=1000):
+#       train_step(v.netlist, v.vector)
+
+# error is None on success; netlist is None and error holds the message if the task failed.
+# events holds the task's fault events (task, bit, kind, component, terminal, old, new) with log_events,
+# graph the variant's device/net graph record (see graph_export.graph_record) with graphs.
+Variant = namedtuple('Variant', ['name', 'netlist', 'source', 'task_index', 'vector', 'seed', 'events', 'error', 'graph'])
+
+def iter_variants(source, vectors=None, seed=None, count=1, templates=None, log_events=False, graphs=False, relabel=True, start_index=0):
+    # Lazily yields one Variant per task.
+    # - vectors given (an int or an iterable of ints, may be unbounded): count variants of the single
+    #   source file per vector, like --batch "[(count, vector, start_index), ...]". Names are numbered
+    #   from start_index; a vector that repeats continues after its previous block, so names stay
+    #   unique within a call (pass a new start_index to keep them unique across calls)
+    # - vectors None: count tasks that each draw a source (a path or a list of paths) and a random
+    #   16-bit vector, like --random_count count
+    # Pass a shared TemplateCache as templates to keep parsed sources across calls.
+    if templates is None:
+        templates = TemplateCache()
+    master_seed = seed if seed is not None else random.randint(0, 2**32 - 1)
+
+    if vectors is None:
+        sources = [source] if isinstance(source, str) else list(source)
+        selection_rng = random.Random(seed) if seed is not None else random.Random()
+        tasks = iter_random_tasks([os.path.abspath(s) for s in sources], "", count, selection_rng)
+    else:
+        if not isinstance(source, str):
+            raise ValueError("explicit vectors need a single source file")
+        if isinstance(vectors, int):
+            vectors = [vectors]
+        tasks = iter_batch_tasks(os.path.abspath(source), "", _number_specs(vectors, count, start_index))
+
+    for chunk in iter_chunks(tasks, RELABEL_CHUNK):
+        results = render_chunk(templates, chunk, master_seed, verbose=False, log_events=log_events, relabel=relabel, graph=graphs)
+        for (i, source_file, name, vector), (content, error, events, _, _, _, graph) in zip(chunk, results):
+            yield Variant(os.path.splitext(name)[0], content, source_file, i, vector, master_seed, events, error, graph)
+
+def _number_specs(vectors, count, start_index):
+    # (count, vector, first index) per vector; repeats of a vector get the next free block
+    next_index = {}
+    for vector in vectors:
+        check_vector(vector)
+        first = next_index.get(vector, start_index)
+        next_index[vector] = first + count
+        yield (count, vector, first)
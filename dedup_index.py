@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+
+# Canonical topology hashing. A rendered netlist is read back as a bipartite device/net
+# graph: devices are labelled by instance name + model + parameter text, nets by name only
+# if they are ports or globals (the testbench binds those by name), all other nets are
+# anonymous. Weisfeiler-Lehman colour refinement runs until the partition stops splitting;
+# colours are re-ranked canonically each round and the per-round signature tables are
+# hashed, so the digest does not depend on net naming or component order.
+#
+# Source instance names are the same in every variant and anchor the refinement, so it
+# settles in a few rounds. Devices added by injection get random name suffixes, which are
+# dropped so that e.g. R_ins_17 and R_ins_4242 in the same place hash the same.
+DIGEST_SIZE = 16
+PASSIVES = ('resistor', 'capacitor')
+INJECTED_NAME = re.compile(r'^([RCM]_(?:fault|ins|chaos))_\d+$')
+
+def _topology(content):
+    # (ports, [(label, nets, symmetric)]) from the TOPOLOGY block of a rendered netlist
+    body = content.split("*--- TOPOLOGY ---*", 1)[-1].split("*--- TESTBENCH ---*", 1)[0]
+    ports = None
+    devices = []
+    for line in body.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('*'):
+            if ports is None and line.startswith('*--- ') and line.endswith(' ---*'):
+                ports = line[5:-5].split()[1:]
+            continue
+        tokens = line.split()
+        name = INJECTED_NAME.sub(r'\1', tokens[0])
+        if len(tokens) >= 4 and tokens[3] in PASSIVES:
+            devices.append((f"{name} {' '.join(tokens[3:])}", tokens[1:3], True))
+        else:
+            devices.append((f"{name} {' '.join(tokens[5:])}", tokens[1:5], False))
+    return ports or [], devices
+
+def _rank(signatures, digest):
+    # Canonical colour per node: rank of its signature among the sorted distinct signatures.
+    # The sorted table (with counts) goes into the digest, since ranks alone are relative.
+    counts = {}
+    for sig in signatures:
+        counts[sig] = counts.get(sig, 0) + 1
+    table = sorted(counts)
+    digest.update(repr([(sig, counts[sig]) for sig in table]).encode())
+    ranks = {sig: r for r, sig in enumerate(table)}
+    return [ranks[sig] for sig in signatures], len(table)
+
+def canonical_hash(content):
+    ports, devices = _topology(content)
+    anchored = set(ports)
+    net_ids = {}
+    dev_nets = []
+    for _, nets, _ in devices:
+        dev_nets.append([net_ids.setdefault(n, len(net_ids)) for n in nets])
+    incidence = [[] for _ in net_ids]
+    for d, nets in enumerate(dev_nets):
+        for role, n in enumerate(nets):
+            incidence[n].append((d, role))
+
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(repr(ports).encode())
+    dev_col, n_dev = _rank([label for label, _, _ in devices], digest)
+    net_col, n_net = _rank([n if (n in anchored or n.endswith('!')) else '' for n in net_ids], digest)
+
+    while True:
+        # Passive terminals are interchangeable, transistor terminals keep their role
+        dev_sig = []
+        for (_, _, symmetric), col, nets in zip(devices, dev_col, dev_nets):
+            around = [net_col[n] for n in nets]
+            dev_sig.append((col, tuple(sorted(around)) if symmetric else tuple(around)))
+        net_sig = []
+        for col, terms in zip(net_col, incidence):
+            around = sorted((dev_col[d], -1 if devices[d][2] else role) for d, role in terms)
+            net_sig.append((col, tuple(around)))
+        dev_col, new_dev = _rank(dev_sig, digest)
+        net_col, new_net = _rank(net_sig, digest)
+        if new_dev == n_dev and new_net == n_net:
+            break
+        n_dev, n_net = new_dev, new_net
+    return digest.hexdigest()
+
+MAGIC = b"CRUCDUP1"
+
+class DedupIndex:
+    # Persistent set of canonical topology hashes, shared across runs. New hashes are
+    # buffered and appended as raw DIGEST_SIZE-byte records after MAGIC. With path None
+    # the index only lives for this run.
+    #
+    # A new hash is claimed by add() as soon as its variant renders, so later duplicates in
+    # the same run are caught, but it only reaches the file once its artifact is durable:
+    # written() queues it after a successful write, release() drops it after a failed one,
+    # and sync() persists the queued hashes of the first `committed` writes, like RunManifest.
+    def __init__(self, path=None, flush_every=4096):
+        self.path = path
+        self.flush_every = flush_every
+        self.seen = set()
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(MAGIC):
+                raise ValueError(f"'{path}' is not a topology dedup index")
+            for pos in range(len(MAGIC), len(data) - DIGEST_SIZE + 1, DIGEST_SIZE):
+                self.seen.add(data[pos:pos + DIGEST_SIZE].hex())
+        self.known = len(self.seen)
+        self.pending = [] # per successful write of this run: its new hash, or None
+        self.synced = 0
+        self.buffer = []
+        self.file = None
+        if path:
+            self.file = open(path, 'ab')
+            if self.file.tell() == 0:
+                self.file.write(MAGIC)
+        # Per-run counters for the uniqueness report
+        self.checked = 0
+        self.new = 0
+
+    def add(self, key):
+        # Claims key for this run; True if this topology has never been generated before
+        self.checked += 1
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        self.new += 1
+        return True
+
+    def release(self, key):
+        # A claimed topology whose write failed: forget it so it can be generated again
+        self.seen.discard(key)
+        self.checked -= 1
+        self.new -= 1
+
+    def written(self, key=None):
+        # Called once per successful write, in write order; key is the hash it claimed, if any
+        self.pending.append(key)
+
+    def sync(self, committed):
+        # Persists the hashes of the first `committed` successful writes of this run
+        count = min(committed - self.synced, len(self.pending))
+        if count <= 0:
+            return
+        if self.file is not None:
+            self.buffer.extend(bytes.fromhex(key) for key in self.pending[:count] if key is not None)
+            if len(self.buffer) >= self.flush_every:
+                self.flush()
+        del self.pending[:count]
+        self.synced += count
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(b"".join(self.buffer))
+            self.file.flush()
+            self.buffer = []
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+
+    def report(self):
+        ratio = self.new / self.checked if self.checked else 0.0
+        return (f"Topology dedup: {self.new}/{self.checked} unique this run (uniqueness ratio {ratio:.3f}), "
+                f"{self.checked - self.new} duplicates, index now holds {len(self.seen)} topologies ({self.known} before this run)")
@@ -0,0 +1,80 @@
+import json
+import struct
+
+# One fault event per terminal/net/parameter touched, as emitted by ErrorInjector._log
+EVENT_FIELDS = ('task', 'bit', 'kind', 'component', 'terminal', 'old', 'new')
+
+# Binary layout: MAGIC, then per event <QB (task, bit; 255 = none) followed by five
+# strings (kind, component, terminal, old, new), each <H length + utf-8 (0xFFFF = None)
+MAGIC = b"CRUCEVT1"
+_HEAD = struct.Struct('<QB')
+_LEN = struct.Struct('<H')
+_NONE = 0xFFFF
+
+def _pack_str(value):
+    if value is None:
+        return _LEN.pack(_NONE)
+    data = str(value).encode('utf-8')[:_NONE - 1]
+    return _LEN.pack(len(data)) + data
+
+class EventLog:
+    # Buffers fault events in memory and writes them in bulk every flush_every events.
+    # Paths ending in .jsonl get one JSON object per line, anything else the binary layout.
+    def __init__(self, path, flush_every=65536):
+        self.path = path
+        self.binary = not path.endswith('.jsonl')
+        self.flush_every = flush_every
+        self.buffer = []
+        self.count = 0
+        self.file = open(path, 'wb')
+        if self.binary:
+            self.file.write(MAGIC)
+
+    def extend(self, events):
+        self.buffer.extend(events)
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.binary:
+            chunks = []
+            for task, bit, *strings in self.buffer:
+                chunks.append(_HEAD.pack(task, 255 if bit is None else bit))
+                chunks.extend(_pack_str(v) for v in strings)
+            self.file.write(b"".join(chunks))
+        else:
+            lines = (json.dumps(dict(zip(EVENT_FIELDS, e))) for e in self.buffer)
+            self.file.write(("\n".join(lines) + "\n").encode('utf-8'))
+        self.count += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def read_events(path):
+    # Yields events from either format as dicts keyed by EVENT_FIELDS
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        for line in data.decode('utf-8').splitlines():
+            if line:
+                yield json.loads(line)
+        return
+
+    pos = len(MAGIC)
+    while pos < len(data):
+        task, bit = _HEAD.unpack_from(data, pos)
+        pos += _HEAD.size
+        strings = []
+        for _ in range(5):
+            (n,) = _LEN.unpack_from(data, pos)
+            pos += _LEN.size
+            if n == _NONE:
+                strings.append(None)
+            else:
+                strings.append(data[pos:pos + n].decode('utf-8'))
+                pos += n
+        yield dict(zip(EVENT_FIELDS, (task, None if bit == 255 else bit, *strings)))
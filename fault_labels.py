@@ -0,0 +1,104 @@
+import os
+from event_log import EVENT_FIELDS
+from archive_writer import next_shard_index
+from graph_export import Vocab, load_npz_mmap, check_vector
+
+# Fault-localization labels: the injection event stream of every written variant, stored as
+# columns in rolling labels_NNNNN.npz sidecar shards (shard_size variants each, same partition
+# as graphs_NNNNN when --graph_export is on). Events are kept in injection order, so cascaded
+# faults (a short on a net an earlier short already merged) stay unambiguous.
+#
+#   name, task, vector       one entry per variant
+#   event_ptr                variant r owns events event_ptr[r]:event_ptr[r+1]
+#   bit                      error bit (0-15) that applied the event, -1 if none
+#   kind                     code into vocab_kind (short, open, kvl_conflict, symmetry, ...)
+#   component                code into vocab_component, -1 if the event is net-level
+#   terminal                 code into vocab_terminal (terminal, or parameter key for parametric faults), -1 if none
+#   old, new                 codes into vocab_value (net names or parameter values), -1 if none:
+#                            merged nets are old -> new, created nets appear as new
+#
+# Shards are uncompressed; load_labels memory-maps every column.
+LABEL_COLUMNS = EVENT_FIELDS[1:]
+
+class LabelShardWriter:
+    def __init__(self, output_dir, shard_size=10000, prefix='labels'):
+        self.output_dir = output_dir
+        self.shard_size = max(1, shard_size)
+        self.prefix = prefix
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.shard_index = next_shard_index(output_dir, prefix, ".npz")
+        self.count = 0
+        self._reset()
+
+    def _reset(self):
+        self.names, self.tasks, self.vectors, self.event_ptr = [], [], [], [0]
+        self.columns = {key: [] for key in LABEL_COLUMNS}
+        self.vocab = {key: Vocab() for key in ('kind', 'component', 'terminal', 'value')}
+
+    def add(self, name, task, vector, events):
+        # events: (task, bit, kind, component, terminal, old, new) tuples from ErrorInjector / RelabelEngine
+        check_vector(vector)
+        cols, v = self.columns, self.vocab
+        for _, bit, kind, component, terminal, old, new in events:
+            cols['bit'].append(-1 if bit is None else bit)
+            cols['kind'].append(v['kind'].code(kind))
+            cols['component'].append(-1 if component is None else v['component'].code(component))
+            cols['terminal'].append(-1 if terminal is None else v['terminal'].code(terminal))
+            cols['old'].append(-1 if old is None else v['value'].code(str(old)))
+            cols['new'].append(-1 if new is None else v['value'].code(str(new)))
+        self.names.append(name)
+        self.tasks.append(task)
+        self.vectors.append(vector)
+        self.event_ptr.append(len(cols['bit']))
+        self.count += 1
+        if len(self.names) >= self.shard_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.names:
+            return
+        import numpy as np # only needed once labels are actually written
+        path = os.path.join(self.output_dir, f"{self.prefix}_{self.shard_index:05d}.npz")
+        self.shard_index += 1
+        cols = self.columns
+        arrays = {
+            "name": np.array(self.names, dtype=str),
+            "task": np.array(self.tasks, dtype=np.int64),
+            "vector": np.array(self.vectors, dtype=np.uint16),
+            "event_ptr": np.array(self.event_ptr, dtype=np.int64),
+            "bit": np.array(cols['bit'], dtype=np.int8),
+            "kind": np.array(cols['kind'], dtype=np.int16),
+            "component": np.array(cols['component'], dtype=np.int32),
+            "terminal": np.array(cols['terminal'], dtype=np.int16),
+            "old": np.array(cols['old'], dtype=np.int32),
+            "new": np.array(cols['new'], dtype=np.int32),
+        }
+        for key, vocab in self.vocab.items():
+            arrays[f"vocab_{key}"] = np.array(vocab.values, dtype=str)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        self._reset()
+
+    def close(self):
+        self._flush()
+
+def load_labels(path):
+    return load_npz_mmap(path)
+
+def labels_at(shard, r):
+    # Events of variant r as dicts keyed like the event log (strings decoded, None where absent)
+    e0, e1 = shard["event_ptr"][r], shard["event_ptr"][r + 1]
+    def decode(vocab, code):
+        return None if code < 0 else str(shard[vocab][code])
+    events = []
+    for k in range(e0, e1):
+        bit = int(shard["bit"][k])
+        events.append({"task": int(shard["task"][r]), "bit": None if bit < 0 else bit,
+                       "kind": decode("vocab_kind", shard["kind"][k]),
+                       "component": decode("vocab_component", shard["component"][k]),
+                       "terminal": decode("vocab_terminal", shard["terminal"][k]),
+                       "old": decode("vocab_value", shard["old"][k]), "new": decode("vocab_value", shard["new"][k])})
+    return events
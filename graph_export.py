@@ -0,0 +1,280 @@
+import json
+import os
+import struct
+import zipfile
+from components import Transistor, Resistor
+from archive_writer import next_shard_index
+
+# Graph-tensor export: every variant's device/net bipartite graph as integer arrays, built
+# from the components at render time (no netlist text is parsed). Variants are appended to
+# rolling shards; within a shard all records are concatenated CSR-style:
+#
+#   name, task, vector                 one entry per record (vector is the 16-bit label)
+#   device_ptr, net_ptr, edge_ptr      record r owns devices device_ptr[r]:device_ptr[r+1], etc.
+#   node_ptr                           device_ptr + net_ptr; a record's nodes are its devices, then its nets
+#   node_type                          NODE_DEVICE / NODE_NET / NODE_PORT / NODE_GLOBAL per node
+#   device_type                        code into vocab_device_type (nfet, pfet, resistor, ...)
+#   net_label                          code into vocab_net_label for port and global nets, -1 for internal nets
+#   edge_src, edge_dst, edge_terminal  device node -> net node (record-local node indices), terminal code
+#   param_ptr, param_key, param_value  per device (CSR over all devices of the shard): geometry/value
+#                                      parameters, e.g. l -> nA1, as codes into vocab_param_key/_value
+#
+# npz shards are stored uncompressed so load_graph_shard can memory-map every array. parquet shards
+# (optional pyarrow) hold one row per record with the same columns as lists and the vocabularies in
+# the schema metadata.
+GRAPH_FORMATS = ('npz', 'parquet')
+TERMINALS = ('D', 'G', 'S', 'B', 'P', 'N')
+TERMINAL_CODE = {t: i for i, t in enumerate(TERMINALS)}
+NODE_DEVICE, NODE_NET, NODE_PORT, NODE_GLOBAL = 0, 1, 2, 3
+# Largest error vector (bits 240-255 of USPECT-256); shards store vectors as uint16
+VECTOR_MAX = 0xFFFF
+
+def check_vector(vector):
+    # Rejects vectors outside 16 bits up front, so a bad one never reaches a shard's uint16 column
+    if not 0 <= vector <= VECTOR_MAX:
+        raise ValueError(f"error vector {vector} is outside the 16-bit range 0..{VECTOR_MAX}")
+    return vector
+
+def _numpy():
+    import numpy as np # only needed once graphs are actually exported
+    return np
+
+def _pyarrow():
+    # Optional dependency, only needed for --graph_export parquet
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("parquet export requires the 'pyarrow' package (pip install pyarrow)")
+    return pyarrow
+
+def graph_record(components, net_names, ports):
+    # One variant's graph as plain lists (cheap to pickle back from workers). net_names holds the
+    # terminal nets of all components flattened in component / TERMINALS order; None is unconnected.
+    port_set = set(ports)
+    net_index = {}
+    device_type, edge_src, edge_dst, edge_terminal = [], [], [], []
+    param_count, param_key, param_value = [], [], []
+    pos = 0
+    for d, comp in enumerate(components):
+        if isinstance(comp, Transistor):
+            device_type.append(comp.type)
+        else:
+            device_type.append('resistor' if isinstance(comp, Resistor) else 'capacitor')
+        for terminal in comp.TERMINALS:
+            net = net_names[pos]
+            pos += 1
+            if net is None:
+                continue
+            edge_src.append(d)
+            edge_dst.append(net_index.setdefault(net, len(net_index)))
+            edge_terminal.append(TERMINAL_CODE[terminal])
+        params = [p.split('=', 1) for p in comp.raw_params.split() if '=' in p]
+        param_count.append(len(params))
+        for key, value in params:
+            param_key.append(key)
+            param_value.append(value)
+
+    net_type, net_label = [], []
+    for net in net_index:
+        if net in port_set:
+            net_type.append(NODE_PORT)
+            net_label.append(net)
+        elif net.endswith('!'):
+            net_type.append(NODE_GLOBAL)
+            net_label.append(net)
+        else:
+            net_type.append(NODE_NET)
+            net_label.append(None)
+    return {"device_type": device_type, "net_type": net_type, "net_label": net_label,
+            "edge_src": edge_src, "edge_dst": edge_dst, "edge_terminal": edge_terminal,
+            "param_count": param_count, "param_key": param_key, "param_value": param_value}
+
+class Vocab:
+    # String -> dense integer code, in first-seen order
+    __slots__ = ('codes', 'values')
+
+    def __init__(self, values=()):
+        self.codes = {}
+        self.values = []
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+class GraphShardWriter:
+    # Appends graph records to rolling graphs_NNNNN.npz / .parquet shards of shard_size records
+    def __init__(self, output_dir, fmt='npz', shard_size=10000, prefix='graphs'):
+        if fmt not in GRAPH_FORMATS:
+            raise ValueError(f"Unknown graph export format: {fmt}")
+        if fmt == 'parquet':
+            _pyarrow()
+        _numpy()
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.shard_size = max(1, shard_size)
+        self.prefix = prefix
+        self.extension = f".{fmt}"
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.shard_index = next_shard_index(output_dir, prefix, self.extension)
+        self.count = 0
+        self._reset()
+
+    def _reset(self):
+        self.records = []
+        self.vocab = {key: Vocab() for key in ('device_type', 'net_label', 'param_key', 'param_value')}
+
+    def add(self, name, task, vector, record):
+        check_vector(vector)
+        v = self.vocab
+        self.records.append((name, task, vector, {
+            "device_type": [v['device_type'].code(t) for t in record["device_type"]],
+            "net_type": record["net_type"],
+            "net_label": [v['net_label'].code(n) if n is not None else -1 for n in record["net_label"]],
+            "edge_src": record["edge_src"],
+            "edge_dst": [len(record["device_type"]) + n for n in record["edge_dst"]],
+            "edge_terminal": record["edge_terminal"],
+            "param_count": record["param_count"],
+            "param_key": [v['param_key'].code(k) for k in record["param_key"]],
+            "param_value": [v['param_value'].code(p) for p in record["param_value"]],
+        }))
+        self.count += 1
+        if len(self.records) >= self.shard_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.records:
+            return
+        path = os.path.join(self.output_dir, f"{self.prefix}_{self.shard_index:05d}{self.extension}")
+        self.shard_index += 1
+        tmp_path = path + ".tmp"
+        if self.fmt == 'npz':
+            self._write_npz(tmp_path)
+        else:
+            self._write_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        self._reset()
+
+    def _vocab_arrays(self):
+        np = _numpy()
+        arrays = {"vocab_terminal": np.array(TERMINALS)}
+        for key, vocab in self.vocab.items():
+            arrays[f"vocab_{key}"] = np.array(vocab.values, dtype=str)
+        return arrays
+
+    def _write_npz(self, path):
+        np = _numpy()
+        cols = {key: [] for key in self.records[0][3]}
+        device_ptr, net_ptr, edge_ptr, param_ptr = [0], [0], [0], [0]
+        node_type = []
+        for _, _, _, rec in self.records:
+            for key, values in rec.items():
+                cols[key].extend(values)
+            device_ptr.append(device_ptr[-1] + len(rec["device_type"]))
+            net_ptr.append(net_ptr[-1] + len(rec["net_type"]))
+            edge_ptr.append(edge_ptr[-1] + len(rec["edge_src"]))
+            for count in rec["param_count"]:
+                param_ptr.append(param_ptr[-1] + count)
+            node_type.extend([NODE_DEVICE] * len(rec["device_type"]))
+            node_type.extend(rec["net_type"])
+
+        arrays = {
+            "name": np.array([r[0] for r in self.records], dtype=str),
+            "task": np.array([r[1] for r in self.records], dtype=np.int64),
+            "vector": np.array([r[2] for r in self.records], dtype=np.uint16),
+            "device_ptr": np.array(device_ptr, dtype=np.int64),
+            "net_ptr": np.array(net_ptr, dtype=np.int64),
+            "node_ptr": np.array(device_ptr, dtype=np.int64) + np.array(net_ptr, dtype=np.int64),
+            "edge_ptr": np.array(edge_ptr, dtype=np.int64),
+            "param_ptr": np.array(param_ptr, dtype=np.int64),
+            "node_type": np.array(node_type, dtype=np.int8),
+            "device_type": np.array(cols["device_type"], dtype=np.int32),
+            "net_label": np.array(cols["net_label"], dtype=np.int32),
+            "edge_src": np.array(cols["edge_src"], dtype=np.int32),
+            "edge_dst": np.array(cols["edge_dst"], dtype=np.int32),
+            "edge_terminal": np.array(cols["edge_terminal"], dtype=np.int8),
+            "param_key": np.array(cols["param_key"], dtype=np.int32),
+            "param_value": np.array(cols["param_value"], dtype=np.int32),
+        }
+        arrays.update(self._vocab_arrays())
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def _write_parquet(self, path):
+        pa = _pyarrow()
+        rows = {key: [] for key in ("name", "task", "vector", "node_type", "device_type", "net_label",
+                                    "edge_src", "edge_dst", "edge_terminal", "param_ptr", "param_key", "param_value")}
+        for name, task, vector, rec in self.records:
+            rows["name"].append(name)
+            rows["task"].append(task)
+            rows["vector"].append(vector)
+            rows["node_type"].append([NODE_DEVICE] * len(rec["device_type"]) + rec["net_type"])
+            param_ptr = [0]
+            for count in rec["param_count"]:
+                param_ptr.append(param_ptr[-1] + count)
+            rows["param_ptr"].append(param_ptr)
+            for key in ("device_type", "net_label", "edge_src", "edge_dst", "edge_terminal", "param_key", "param_value"):
+                rows[key].append(rec[key])
+        types = {"name": pa.string(), "task": pa.int64(), "vector": pa.uint16(), "node_type": pa.list_(pa.int8()),
+                 "edge_terminal": pa.list_(pa.int8())}
+        table = pa.table({key: pa.array(values, type=types.get(key, pa.list_(pa.int32())))
+                          for key, values in rows.items()})
+        vocab = {"terminal": list(TERMINALS)}
+        vocab.update({key: v.values for key, v in self.vocab.items()})
+        table = table.replace_schema_metadata({"crucible_vocab": json.dumps(vocab)})
+        pa.parquet.write_table(table, path)
+
+    def close(self):
+        self._flush()
+
+def load_graph_shard(path):
+    # npz: dict of arrays memory-mapped straight from the (stored, uncompressed) shard.
+    # parquet: a memory-mapped pyarrow Table.
+    if path.endswith('.parquet'):
+        return _pyarrow().parquet.read_table(path, memory_map=True)
+    return load_npz_mmap(path)
+
+def load_npz_mmap(path):
+    # Every member of an uncompressed .npz as a read-only np.memmap (no copy, no decompression)
+    np = _numpy()
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: member {info.filename} is compressed and cannot be memory-mapped")
+            # Data starts after the local file header (30 bytes + name + extra field)
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            key = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if 0 in shape:
+                arrays[key] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[key] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                        order='F' if fortran else 'C')
+    return arrays
+
+def graph_at(shard, r):
+    # Record r of a loaded npz shard as record-local arrays (views, nothing is copied)
+    d0, d1 = shard["device_ptr"][r], shard["device_ptr"][r + 1]
+    n0, n1 = shard["node_ptr"][r], shard["node_ptr"][r + 1]
+    e0, e1 = shard["edge_ptr"][r], shard["edge_ptr"][r + 1]
+    p0, p1 = shard["param_ptr"][d0], shard["param_ptr"][d1]
+    return {"name": str(shard["name"][r]), "task": int(shard["task"][r]), "vector": int(shard["vector"][r]),
+            "node_type": shard["node_type"][n0:n1], "device_type": shard["device_type"][d0:d1],
+            "net_label": shard["net_label"][shard["net_ptr"][r]:shard["net_ptr"][r + 1]],
+            "edge_src": shard["edge_src"][e0:e1], "edge_dst": shard["edge_dst"][e0:e1],
+            "edge_terminal": shard["edge_terminal"][e0:e1],
+            "param_ptr": shard["param_ptr"][d0:d1 + 1] - p0,
+            "param_key": shard["param_key"][p0:p1], "param_value": shard["param_value"][p0:p1]}
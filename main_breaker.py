@@ -3,8 +3,219 @@ import argparse
 import sys
 import os
 import ast
+import csv
+import json
+import itertools
+import multiprocessing
 import random
-from circuit_breaker import NetlistParser, ErrorInjector
+from template_cache import TemplateCache, merge_cache_stats, format_cache_stats
+from archive_writer import DirectoryWriter, ShardWriter, WriteQueue, FORMATS, COMPRESSIONS
+from event_log import EventLog
+from profiler import Profiler
+from dedup_index import DedupIndex
+from run_manifest import RunManifest
+from graph_export import GraphShardWriter, GRAPH_FORMATS, check_vector
+from fault_labels import LabelShardWriter
+from task_pipeline import RELABEL_CHUNK, render_task, render_chunk, iter_batch_tasks, iter_random_tasks, iter_chunks
+
+def report_writes(outcomes, quiet=False, manifest=None, profiler=None, graphs=None, labels=None, dedup=None):
+    # Reports finished writes ((task, samples, record, events, topology), error) from a WriteQueue
+    # in task order (failures always), records successes in the run manifest, the graph export,
+    # the label shards and the dedup index, and returns how many succeeded. Graph records, fault
+    # events and newly claimed topology hashes ride in the tag so only written artifacts get a
+    # graph or label row or a persisted hash.
+    success_count = 0
+    for (task, samples, record, events, topology), error in outcomes:
+        i, _, out_file, vector = task
+        if error is not None:
+            print(f"  [FAIL] Failed to generate '{out_file}': {error}")
+            if topology is not None:
+                dedup.release(topology)
+        else:
+            success_count += 1
+            if not quiet:
+                print(f"  [OK] Saved to '{out_file}' (Vector: {vector})")
+            if manifest is not None:
+                manifest.record(task)
+            name = os.path.splitext(os.path.basename(out_file))[0]
+            if record is not None and graphs is not None:
+                graphs.add(name, i, vector, record)
+            if labels is not None:
+                labels.add(name, i, vector, events)
+            if dedup is not None:
+                dedup.written(topology)
+        if profiler is not None:
+            profiler.add_task(i, out_file, samples)
+    return success_count
+
+def run_task(templates, writer, i, source_file, out_file, vector, master_seed, check_graph=False, quiet=False, event_log=None, profiler=None):
+    events = [] if event_log is not None else None
+    samples = [] if profiler is not None else None
+    try:
+        content = render_task(templates, i, source_file, out_file, vector, master_seed, check_graph=check_graph,
+                              verbose=not quiet, events=events, profile=samples)
+    except Exception as e:
+        # traceback.print_exc()
+        content, error = None, e
+    else:
+        error = None
+        if event_log is not None:
+            event_log.extend(events)
+    write_queue = WriteQueue(writer)
+    write_queue.submit(out_file, content, ((i, source_file, out_file, vector), samples, None, None, None), error=error, profile=samples)
+    return report_writes(write_queue.finished(), quiet=quiet, profiler=profiler) == 1
+
+def read_provenance(path):
+    # Reads the provenance header written by render_task from an existing artifact
+    fields = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith("*--- TESTBENCH ---*"):
+                break
+            for key in ("Derivative Netlist", "Master Seed", "Task Index", "Task Seed", "Error Vector"):
+                prefix = f"* {key}: "
+                if line.startswith(prefix):
+                    fields[key] = line[len(prefix):].strip()
+    if "Master Seed" not in fields or "Error Vector" not in fields or "Derivative Netlist" not in fields:
+        raise ValueError(f"'{path}' has no ASPECTOR Crucible provenance header")
+    if "Task Index" not in fields:
+        raise ValueError(f"'{path}' predates per-task counter-based seeding (Task Seed header) and cannot be regenerated by this version")
+    return (fields["Derivative Netlist"], int(fields["Master Seed"]), int(fields["Task Index"]),
+            int(fields["Error Vector"].replace('_', ''), 2))
+
+def parse_vector(vec_raw):
+    # 16-bit error vector from an int or a string (0b..., bare 0/1 digits, decimal or 0x...)
+    return check_vector(_parse_vector(vec_raw))
+
+def _parse_vector(vec_raw):
+    if isinstance(vec_raw, str):
+        clean_vec = vec_raw.replace('_', '')
+        if vec_raw.startswith("0b"):
+            return int(vec_raw, 2)
+        elif all(c in '01' for c in clean_vec) and len(clean_vec) > 1:
+            # Heuristic: If it contain ONLY 0s and 1s and is > 1 char, assume binary
+            return int(clean_vec, 2)
+        try:
+            return int(vec_raw)
+        except ValueError:
+            return int(vec_raw, 0)
+    if isinstance(vec_raw, int):
+        return vec_raw
+    raise ValueError(f"invalid vector type: {type(vec_raw)}")
+
+def iter_batch_file(path, input_path):
+    # Streams (source_file, count, vector, start_index) rows from a batch plan, one line at a time:
+    #   CSV:   source,count,vector[,start_index]   (optional header row, '#' comment lines)
+    #   JSONL: {"source": ..., "count": ..., "vector": ..., "start_index": ...} or [source, count, vector, start_index]
+    # Relative sources resolve against input_path (a directory, or the directory of a file);
+    # an empty source means input_path itself.
+    base_dir = input_path if os.path.isdir(input_path) else os.path.dirname(input_path)
+    is_jsonl = os.path.splitext(path)[1].lower() in ('.jsonl', '.json')
+    with open(path, 'r', newline='') as f:
+        rows = f if is_jsonl else csv.reader(f)
+        for line_no, row in enumerate(rows, 1):
+            try:
+                if is_jsonl:
+                    if not row.strip():
+                        continue
+                    row = json.loads(row)
+                    if isinstance(row, dict):
+                        row = [row.get("source", ""), row["count"], row["vector"], row.get("start_index", 0)]
+                else:
+                    if not row or not "".join(row).strip() or row[0].lstrip().startswith('#'):
+                        continue
+                    if row[0].strip().lower() == "source":
+                        continue # Header
+                if len(row) == 3:
+                    row = [*row, 0]
+                if len(row) != 4:
+                    raise ValueError("expected source, count, vector[, start_index]")
+                source, count, vector, start_index = row
+                source = str(source).strip()
+                source_file = os.path.join(base_dir, source) if source else input_path
+                if not os.path.isfile(source_file):
+                    raise ValueError(f"source '{source_file}' not found")
+                count, start_index = int(count), int(start_index)
+                if count < 0 or start_index < 0:
+                    raise ValueError("count and start_index must be non-negative")
+                yield source_file, count, parse_vector(vector.strip() if isinstance(vector, str) else vector), start_index
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"Skipping invalid batch row {path}:{line_no}: {e}")
+
+def iter_batch_file_tasks(path, input_path, output_dir):
+    # Expands a streamed batch plan into tasks; only the current row is held in memory
+    for source_file, count, vector, start_index in iter_batch_file(path, input_path):
+        yield from iter_batch_tasks(source_file, output_dir, [(count, vector, start_index)])
+
+def unique_reached(dedup, unique_target):
+    return unique_target is not None and dedup.new >= unique_target
+
+def write_chunk(write_queue, chunk, results, quiet=False, event_log=None, profiler=None, dedup=None, keep_duplicates=False, unique_target=None, manifest=None, graphs=None, labels=None):
+    # Submits rendered results to the WriteQueue in task order and returns (tasks handled, tasks
+    # succeeded, duplicates skipped); successes count once their write has finished, which with a
+    # background writer may be in a later call. Topologies already in the dedup index are skipped
+    # (or written anyway with keep_duplicates); once unique_target new topologies exist the
+    # remaining results are dropped. Written tasks are recorded in the run manifest and their new
+    # topology hashes persisted once the writer has committed them, and their graph records and
+    # fault-localization labels go to the graph and label shard writers only once their write has
+    # succeeded.
+    handled = success_count = duplicates = 0
+    for task, (content, error, events, samples, output, topology, record) in zip(chunk, results):
+        i, _, out_file, vector = task
+        if unique_reached(dedup, unique_target):
+            break
+        handled += 1
+        sys.stdout.write(output)
+        claimed = None
+        if topology is not None:
+            if dedup.add(topology):
+                claimed = topology
+            elif not keep_duplicates:
+                if not quiet:
+                    print(f"  [DUP] Skipped '{out_file}' (topology already generated)")
+                duplicates += 1
+                if profiler is not None:
+                    profiler.add_task(i, out_file, samples)
+                continue
+        if events and event_log is not None:
+            event_log.extend(events)
+        write_queue.submit(out_file, content, (task, samples, record, events, claimed), error=error, profile=samples)
+        success_count += report_writes(write_queue.finished(), quiet=quiet, manifest=manifest, profiler=profiler, graphs=graphs, labels=labels, dedup=dedup)
+    if manifest is not None:
+        manifest.sync(write_queue.committed)
+    if dedup is not None:
+        dedup.sync(write_queue.committed)
+    return handled, success_count, duplicates
+
+# Per-process state for --workers mode
+_worker_templates = None
+_worker_check_graph = False
+_worker_quiet = False
+_worker_log_events = False
+_worker_profile = False
+_worker_relabel = True
+_worker_dedup = False
+_worker_graph = False
+
+def _init_worker(cache_dir, cache_bytes, check_graph, quiet, log_events, profile, relabel, dedup, graph):
+    global _worker_templates, _worker_check_graph, _worker_quiet, _worker_log_events, _worker_profile, _worker_relabel, _worker_dedup, _worker_graph
+    _worker_templates = TemplateCache(cache_dir=cache_dir, max_bytes=cache_bytes)
+    _worker_check_graph = check_graph
+    _worker_quiet = quiet
+    _worker_log_events = log_events
+    _worker_profile = profile
+    _worker_relabel = relabel
+    _worker_dedup = dedup
+    _worker_graph = graph
+
+def _run_chunk_in_worker(job):
+    # Render only; the parent owns the writer and prints each task's captured output in order.
+    # The worker's cumulative template cache stats ride along, keyed by pid.
+    chunk, master_seed = job
+    results = render_chunk(_worker_templates, chunk, master_seed, check_graph=_worker_check_graph,
+                           verbose=not _worker_quiet, log_events=_worker_log_events,
+                           profile=_worker_profile, relabel=_worker_relabel, dedup=_worker_dedup, graph=_worker_graph)
+    return results, (os.getpid(), _worker_templates.stats())
 
 def main():
     parser = argparse.ArgumentParser(description="Circuit Breaker: Inject errors into analog netlists.")
@@ -13,8 +224,30 @@ def main():
     parser.add_argument("output_path", nargs='?', default="results", help="Path to save the modified .scs netlist file (or directory for batch). Defaults to 'results/'.")
     parser.add_argument("--error_vector", type=str, help="Single 16-bit error vector (integer or binary string).")
     parser.add_argument("--batch", type=str, help="List of tuples for batch generation: '[(count, vector), ...]'")
+    parser.add_argument("--batch_file", type=str, help="Batch plan streamed from a CSV (source,count,vector[,start_index]) or JSONL file, read incrementally. Relative sources resolve against input_file (a directory, or the directory of a file); an empty source uses input_file.")
     parser.add_argument("--random_count", type=int, help="Number of random netlists to generate. Input can be a file or directory.")
-    parser.add_argument("--seed", type=int, help="Random seed for reproducibility. If set, each task uses seed + task_index.")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducibility. Each task's randomness is derived from (seed, task_index, error bit).")
+    parser.add_argument("--reproduce", type=str, help="Regenerate one existing artifact from its provenance header. input_file is its source netlist (or a directory containing it).")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes. Task i produces the same artifact regardless of which worker runs it.")
+    parser.add_argument("--check_graph", action="store_true", help="Cross-check the incrementally maintained circuit graph against a full rebuild after every fault (slow, for debugging).")
+    parser.add_argument("--quiet", action="store_true", help="Suppress per-fault and per-task console output (failures and the summary are still printed).")
+    parser.add_argument("--event_log", type=str, help="Write structured fault events to this file, buffered and flushed in bulk (.jsonl for JSON lines, otherwise compact binary).")
+    parser.add_argument("--archive", choices=FORMATS, help="Append variants to rolling shard archives in the output directory instead of one file per variant.")
+    parser.add_argument("--compression", choices=COMPRESSIONS, help="Compress archive shards (per-record frames, so single netlists stay seekable).")
+    parser.add_argument("--shard_size", type=int, default=10000, help="Number of variants per archive (and graph export) shard. Defaults to 10000.")
+    parser.add_argument("--labels", action="store_true", help="Also write fault-localization labels (per applied fault: bit, kind, component, terminal, old/new net or value, in injection order) to columnar labels_NNNNN.npz sidecar shards in the output directory.")
+    parser.add_argument("--graph_export", choices=GRAPH_FORMATS, help="Also write each variant's device/net bipartite graph (node types, terminal-labelled edges, device types, parameter references, error vector label) to columnar graphs_NNNNN shards in the output directory. npz shards are uncompressed and memory-mappable (graph_export.load_graph_shard); parquet needs pyarrow.")
+    parser.add_argument("--write_queue", type=int, default=0, help="Write artifacts on a background thread with up to this many rendered netlists queued; rendering blocks while the queue is full. 0 (default) writes synchronously.")
+    parser.add_argument("--cache_dir", type=str, help="Directory for a persistent parsed-netlist cache keyed by source content hash.")
+    parser.add_argument("--cache_mb", type=int, default=256, help="Memory cap in MiB (per process) for parsed sources kept in memory; least recently used sources are evicted beyond it. 0 disables the cap. Defaults to 256.")
+    parser.add_argument("--scalar_only", action="store_true", help="Inject every task through the per-variant graph path, disabling the vectorized batch engine for relabel-only vectors (bits 243-247 and 255). Outputs are identical either way.")
+    parser.add_argument("--dedup_index", type=str, help="Persistent index of canonical topology hashes (independent of net naming and component order) shared across runs. Variants whose topology is already in it are skipped.")
+    parser.add_argument("--keep_duplicates", action="store_true", help="With --dedup_index, still write duplicate topologies and only record/count them.")
+    parser.add_argument("--unique_count", type=int, help="Random mode: keep sampling until this many new unique topologies were generated (--random_count caps the number of attempts).")
+    parser.add_argument("--manifest", type=str, help="Append-only run manifest (JSON lines) recording task index, source hash, vector, seed and output path of every written artifact. Written only with --manifest, --resume or --incremental; the latter two default to crucible_manifest.jsonl in the output directory.")
+    parser.add_argument("--resume", action="store_true", help="Skip tasks the manifest lists as completed under the same --seed (task index, vector and output path must match). Start a long run with --resume too, so it records the manifest a later --resume reads.")
+    parser.add_argument("--incremental", action="store_true", help="Like --resume, but regenerate artifacts whose source content hash or crucible version differs from the manifest.")
+    parser.add_argument("--profile", type=str, help="Record wall time and allocated-block deltas per stage and per error bit, and write a JSON summary (totals, percentiles, slowest tasks) to this path.")
     
     args = parser.parse_args()
     
@@ -25,8 +258,39 @@ def main():
         print(f"Error: Input file or directory '{input_path}' not found.")
         sys.exit(1)
 
+    if args.reproduce:
+        # Regenerate exactly one artifact from its provenance header
+        try:
+            source_name, master_seed, task_index, vector = read_provenance(args.reproduce)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        source_file = os.path.join(input_path, source_name) if os.path.isdir(input_path) else input_path
+        if os.path.basename(source_file) != source_name:
+            print(f"Warning: artifact was derived from '{source_name}', regenerating from '{os.path.basename(source_file)}'")
+        if output_abs_path.endswith('.scs'):
+            out_file = output_abs_path
+        else:
+            out_file = os.path.join(output_abs_path, os.path.basename(args.reproduce))
+        print(f"Reproducing task {task_index} (Master Seed: {master_seed}, Vector: {vector})")
+        ok = run_task(TemplateCache(cache_dir=args.cache_dir), DirectoryWriter(), task_index, source_file, out_file, vector, master_seed, check_graph=args.check_graph)
+        sys.exit(0 if ok else 1)
+
+    if (args.resume or args.incremental) and args.seed is None:
+        print("Error: --resume and --incremental need the original run's --seed to replay its tasks.")
+        sys.exit(1)
+
+    if args.compression and not args.archive:
+        print("Error: --compression applies to archive shards only (use it with --archive).")
+        sys.exit(1)
+
+    if args.unique_count and not args.random_count:
+        print("Error: --unique_count requires random mode (--random_count caps the number of attempts).")
+        sys.exit(1)
+
     # Determine mode: Single, Batch, or Random
-    tasks = [] # List of (source_file, output_file, vector)
+    tasks = [] # Iterable of (source_file, output_file, vector)
+    total_tasks = 1
     
     if args.batch:
         try:
@@ -44,8 +308,7 @@ def main():
                  print("Error: Batch mode requires a single input file, not a directory.")
                  sys.exit(1)
 
-            base_name = os.path.splitext(os.path.basename(input_path))[0]
-            
+            batch_specs = [] # List of (count, vector, start_index)
             for item in batch_list:
                 # Handle tuple unpacking with optional start_index
                 start_index = 0
@@ -58,39 +321,33 @@ def main():
                     continue
 
                 # Parse vector
-                if isinstance(vec_raw, str):
-                    clean_vec = vec_raw.replace('_', '')
-                    if vec_raw.startswith("0b"):
-                        vector = int(vec_raw, 2)
-                    elif all(c in '01' for c in clean_vec) and len(clean_vec) > 1:
-                        # Heuristic: If it contain ONLY 0s and 1s and is > 1 char, assume binary
-                         vector = int(clean_vec, 2)
-                    else:
-                        try:
-                            vector = int(vec_raw)
-                        except:
-                            print(f"Skipping invalid vector: {vec_raw}")
-                            continue
-                elif isinstance(vec_raw, int):
-                    vector = vec_raw
-                else:
-                    print(f"Skipping invalid vector type: {type(vec_raw)}")
+                try:
+                    vector = parse_vector(vec_raw)
+                except ValueError as e:
+                    print(f"Skipping invalid vector: {vec_raw} ({e})")
                     continue
                 
-                # Format binary string 16-bit
-                bin_full = f"{vector:016b}"
-                # Insert underscore after 8th bit: 12345678_12345678
-                binary_str = f"{bin_full[:8]}_{bin_full[8:]}"
-                
-                for i in range(start_index, start_index + count):
-                    filename = f"{base_name}_{binary_str}_{i}.scs"
-                    full_path = os.path.join(output_dir, filename)
-                    tasks.append((input_path, full_path, vector))
+                batch_specs.append((count, vector, start_index))
+
+            # Tasks are expanded lazily; only the per-item specs are held in memory
+            total_tasks = sum(count for count, _, _ in batch_specs)
+            tasks = iter_batch_tasks(input_path, output_dir, batch_specs)
                     
         except Exception as e:
             print(f"Error parsing batch argument: {e}")
             sys.exit(1)
 
+    elif args.batch_file:
+        # Batch plan streamed from a file: rows are read as tasks are consumed, so memory does not
+        # depend on the plan size and the total is not known up front
+        if not os.path.isfile(args.batch_file):
+            print(f"Error: Batch file '{args.batch_file}' not found.")
+            sys.exit(1)
+        output_dir = output_abs_path
+        os.makedirs(output_dir, exist_ok=True)
+        total_tasks = None
+        tasks = iter_batch_file_tasks(os.path.abspath(args.batch_file), input_path, output_dir)
+
     elif args.random_count:
         # Random Mode
         count = args.random_count
@@ -110,36 +367,21 @@ def main():
                 print(f"Error: No .scs files found in directory '{input_path}'.")
                 sys.exit(1)
         
-        print(f"Found {len(source_files)} source files. Generating {count} random tasks...")
-        
-        # We need a seed generator for the vector selection if we want THAT to be deterministic based on master seed too?
-        # The main loop sets a seed based on master_seed + i. 
-        # But we need to select files/vectors NOW to build the task list. 
-        # Alternatively, we can build the task list with placeholders or just do the random selection here using a temporary RNG.
-        # Let's use the same logic as the main loop: use a temporary seed?
-        # Actually, best to just use random here, and let the main loop enforce determinism for the injection content?
-        # No, if we want full reproducibility, the task generation (which file, which vector) needs to be seeded too.
+        if args.unique_count:
+            print(f"Found {len(source_files)} source files. Sampling up to {count} random tasks for {args.unique_count} unique topologies...")
+        else:
+            print(f"Found {len(source_files)} source files. Generating {count} random tasks...")
         
-        # Let's handle seed early
+        # File/vector selection gets its own RNG, separate from the per-task, per-bit task_rng
+        # streams, so the lazily planned tasks depend only on --seed, not on how they are rendered
         if args.seed is not None:
-            random.seed(args.seed)
+            selection_rng = random.Random(args.seed)
             print(f"Seeding random mode selection with: {args.seed}")
-            
-        for i in range(count):
-            # Select random source
-            src = random.choice(source_files)
-            # Select random vector (16-bit)
-            vector = random.randint(0, 65535)
-            
-            bin_full = f"{vector:016b}"
-            binary_str = f"{bin_full[:8]}_{bin_full[8:]}"
-            base_name = os.path.splitext(os.path.basename(src))[0]
-            
-            # Filename: {original}_{vector}_{index}.scs
-            filename = f"{base_name}_{binary_str}_{i}.scs"
-            out_file = os.path.join(output_dir, filename)
-            
-            tasks.append((src, out_file, vector))
+        else:
+            selection_rng = random.Random()
+
+        total_tasks = count
+        tasks = iter_random_tasks(source_files, output_dir, count, selection_rng)
 
     elif args.error_vector:
         # Single mode
@@ -149,19 +391,8 @@ def main():
              sys.exit(1)
 
         try:
-            vec_raw = args.error_vector
-            if isinstance(vec_raw, str):
-                clean_vec = vec_raw.replace('_', '')
-                if vec_raw.startswith("0b"):
-                    vector = int(vec_raw, 2)
-                elif all(c in '01' for c in clean_vec) and len(clean_vec) > 1:
-                    # Heuristic: If it contain ONLY 0s and 1s and is > 1 char, assume binary
-                     vector = int(clean_vec, 2)
-                else:
-                    vector = int(vec_raw)
-            else:
-                vector = int(vec_raw)
-            
+            vector = parse_vector(args.error_vector)
+
             if args.output_path == "results":
                 output_dir = output_abs_path
                 os.makedirs(output_dir, exist_ok=True)
@@ -186,11 +417,11 @@ def main():
                     out_file = os.path.join(output_dir, filename)
                     tasks.append((input_path, out_file, vector))
             
-        except ValueError:
-            print("Error: Invalid error vector.")
+        except ValueError as e:
+            print(f"Error: Invalid error vector ({e}).")
             sys.exit(1)
     else:
-        print("Error: One of --error_vector, --batch, or --random_count must be provided.")
+        print("Error: One of --error_vector, --batch, --batch_file, --random_count or --reproduce must be provided.")
         sys.exit(1)
 
     # Determine seed: Use provided or generate a random one
@@ -205,65 +436,128 @@ def main():
     print(f"Processing tasks with master seed: {master_seed}")
     
     success_count = 0
-    
-    for i, (source_file, out_file, vector) in enumerate(tasks):
+    handled_count = 0
+    duplicate_count = 0 # tasks skipped because their topology was already generated
+
+    # Shards, sidecars and the manifest go next to where the individual files would have been written
+    artifact_dir = output_abs_path if not output_abs_path.endswith('.scs') else os.path.dirname(output_abs_path)
+    if args.archive:
         try:
-            # Use master_seed + index for deterministic variability
-            task_seed = master_seed + i
-            random.seed(task_seed)
-                
-            # Re-parse for each generation to ensure fresh state
-            netlist_parser = NetlistParser(source_file)
-            netlist_parser.parse()
-            
-            injector = ErrorInjector(netlist_parser)
-            injector.inject(vector)
-            
-            bin_full = f"{vector:016b}"
-            binary_str = f"{bin_full[:8]}_{bin_full[8:]}"
-            
-            # Construct new circuit name: {original_name}_{bin}_{index}
-            filename_no_ext = os.path.splitext(os.path.basename(out_file))[0]
-            new_circuit_name = filename_no_ext
-            
-            new_content = netlist_parser.regenerate(new_circuit_name=new_circuit_name)
-            
-            # Prepare Metadata Block
-            date_str = os.popen('date').read().strip()
-            # Format: 0000_0000_0000_0001
-            # bin_full is 16 chars. binary_str is 8_8.
-            vector_str = binary_str 
-            
-            metadata = [
-                "* Generated By ASPECTOR Crucible",
-                f"* Derivative Netlist: {os.path.basename(source_file)}",
-                f"* Master Seed: {master_seed}",
-                f"* Task Seed: {task_seed}",
-                f"* Error Vector: {vector_str}",
-                f"* Date: {date_str}",
-                "" # Empty line
-            ]
-            metadata_block = "\n".join(metadata)
-            
-            # Inject metadata after *--- TOPOLOGY ---*
-            if "*--- TOPOLOGY ---*" in new_content:
-                new_content = new_content.replace("*--- TOPOLOGY ---*", f"*--- TOPOLOGY ---*\n\n{metadata_block}")
-            else:
-                # Fallback: Prepend if marker not found
-                new_content = metadata_block + "\n" + new_content
+            writer = ShardWriter(artifact_dir, fmt=args.archive, compression=args.compression, shard_size=args.shard_size)
+        except (ValueError, RuntimeError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    else:
+        writer = DirectoryWriter()
+    write_queue = WriteQueue(writer, depth=args.write_queue)
 
-            os.makedirs(os.path.dirname(out_file), exist_ok=True)
-            with open(out_file, 'w') as f:
-                f.write(new_content)
-                
-            print(f"  [OK] Saved to '{out_file}' (Vector: {vector})")
-            success_count += 1
-            
-        except Exception as e:
-            print(f"  [FAIL] Failed to generate '{out_file}': {e}")
-            # traceback.print_exc()
+    graphs = None
+    if args.graph_export:
+        try:
+            graphs = GraphShardWriter(artifact_dir, fmt=args.graph_export, shard_size=args.shard_size)
+        except (ImportError, RuntimeError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    labels = LabelShardWriter(artifact_dir, shard_size=args.shard_size) if args.labels else None
+
+    event_log = EventLog(args.event_log) if args.event_log else None
+    # Labels are built from the same per-task event stream as --event_log
+    log_events = event_log is not None or labels is not None
+    profiler = Profiler() if args.profile else None
+    dedup = None
+    if args.dedup_index or args.unique_count:
+        try:
+            dedup = DedupIndex(args.dedup_index)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if dedup.known:
+            print(f"Loaded {dedup.known} known topologies from '{args.dedup_index}'")
+
+    # Completed tasks are recorded (next to the outputs unless another manifest path is given) only
+    # when asked for, and earlier entries are only loaded when they decide which tasks to skip
+    manifest = None
+    manifest_path = args.manifest or os.path.join(artifact_dir, "crucible_manifest.jsonl")
+    if args.manifest or args.resume or args.incremental:
+        try:
+            manifest = RunManifest(manifest_path, master_seed, load=args.resume or args.incremental)
+        except OSError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    skip = None
+    if args.resume or args.incremental:
+        print(f"Loaded {manifest.known} completed artifacts from '{manifest_path}'")
+        check_source = args.incremental
+        skip = lambda task: manifest.is_current(task, check_source)
+    dedup_args = dict(dedup=dedup, keep_duplicates=args.keep_duplicates, unique_target=args.unique_count, manifest=manifest, graphs=graphs, labels=labels)
+    
+    # Consecutive relabel-only tasks on one source share a vectorized batch; graph checks need the scalar path
+    relabel = not args.scalar_only and not args.check_graph
+    cache_bytes = args.cache_mb * 2**20 if args.cache_mb > 0 else None
 
-    print(f"\nCompleted {success_count}/{len(tasks)} tasks.")
+    try:
+        if args.workers > 1:
+            # Each worker keeps its own template cache; imap yields chunk results in task order
+            chunksize = 64 if total_tasks is None else max(1, min(64, total_tasks // (args.workers * 4)))
+            work = ((chunk, master_seed) for chunk in iter_chunks(tasks, chunksize, skip))
+            # Pool.imap drains its input eagerly, so feed it bounded windows to keep memory flat
+            window = args.workers * 8
+            worker_stats = {} # pid -> latest cumulative template cache stats
+            with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(args.cache_dir, cache_bytes, args.check_graph, args.quiet, log_events, profiler is not None, relabel, dedup is not None, graphs is not None)) as pool:
+                while not unique_reached(dedup, args.unique_count):
+                    jobs = list(itertools.islice(work, window))
+                    if not jobs:
+                        break
+                    for (chunk, _), (results, (pid, stats)) in zip(jobs, pool.imap(_run_chunk_in_worker, jobs)):
+                        worker_stats[pid] = stats
+                        handled, ok, dups = write_chunk(write_queue, chunk, results, quiet=args.quiet, event_log=event_log, profiler=profiler, **dedup_args)
+                        handled_count += handled
+                        success_count += ok
+                        duplicate_count += dups
+            cache_stats = merge_cache_stats(worker_stats.values())
+        else:
+            # Each source is parsed once; every task gets an independent copy of the parsed template
+            templates = TemplateCache(cache_dir=args.cache_dir, max_bytes=cache_bytes)
+            for chunk in iter_chunks(tasks, RELABEL_CHUNK, skip):
+                if unique_reached(dedup, args.unique_count):
+                    break
+                results = render_chunk(templates, chunk, master_seed, check_graph=args.check_graph, verbose=not args.quiet,
+                                       log_events=log_events, profile=profiler is not None, relabel=relabel,
+                                       dedup=dedup is not None, graph=graphs is not None)
+                handled, ok, dups = write_chunk(write_queue, chunk, results, quiet=args.quiet, event_log=event_log, profiler=profiler, **dedup_args)
+                handled_count += handled
+                success_count += ok
+                duplicate_count += dups
+            cache_stats = templates.stats()
+    finally:
+        # Every queued write is flushed and reported, also when the run is interrupted
+        write_queue.close()
+        success_count += report_writes(write_queue.finished(), quiet=args.quiet, manifest=manifest, profiler=profiler, graphs=graphs, labels=labels, dedup=dedup)
+        if manifest is not None:
+            manifest.sync(write_queue.committed)
+            manifest.close()
+        if dedup is not None:
+            dedup.sync(write_queue.committed)
+        if graphs is not None:
+            graphs.close()
+        if labels is not None:
+            labels.close()
+    if skip is not None:
+        print(f"Skipped {manifest.skipped} tasks already completed per '{manifest_path}'")
+    if event_log is not None:
+        event_log.close()
+        print(f"Wrote {event_log.count} fault events to '{args.event_log}'")
+    if dedup is not None:
+        dedup.close()
+        print(dedup.report())
+        if args.unique_count and dedup.new < args.unique_count:
+            print(f"Warning: only {dedup.new}/{args.unique_count} unique topologies found within {handled_count} attempts")
+    print(format_cache_stats(cache_stats))
+    print(f"\nCompleted {success_count}/{handled_count - duplicate_count} tasks.")
+    if duplicate_count:
+        print(f"Skipped {duplicate_count} tasks with an already generated topology.")
+    if profiler is not None:
+        profiler.report(args.profile)
 
 if __name__ == "__main__":
     main()
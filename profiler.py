@@ -0,0 +1,120 @@
+import contextlib
+import heapq
+import json
+import math
+import sys
+import time
+
+# Stage samples are (stage, seconds, allocated_blocks_delta) tuples collected per task.
+# Allocation counts use sys.getallocatedblocks(): the net change in live Python memory
+# blocks across the stage, which is cheap enough to take around every stage.
+_NULL_STAGE = contextlib.nullcontext()
+
+class _StageTimer:
+    __slots__ = ('samples', 'name', 'start', 'blocks')
+
+    def __init__(self, samples, name):
+        self.samples = samples
+        self.name = name
+
+    def __enter__(self):
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append((self.name, time.perf_counter() - self.start, sys.getallocatedblocks() - self.blocks))
+        return False
+
+def stage(samples, name):
+    # Times a block into samples; a shared no-op context when profiling is off (samples is None)
+    if samples is None:
+        return _NULL_STAGE
+    return _StageTimer(samples, name)
+
+class _Histogram:
+    # Log-bucketed durations (8 buckets per doubling from 1us) for constant-memory percentiles
+    BASE = 1e-6
+    PER_OCTAVE = 8
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.blocks = 0
+
+    def add(self, seconds, blocks):
+        k = 0 if seconds <= self.BASE else int(math.log2(seconds / self.BASE) * self.PER_OCTAVE) + 1
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.blocks += blocks
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        target = q * self.count
+        seen = 0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen >= target:
+                return min(self.max, self.BASE * 2 ** (k / self.PER_OCTAVE))
+        return self.max
+
+class Profiler:
+    def __init__(self, top_n=10):
+        self.stages = {}
+        self.slowest = [] # min-heap of (seconds, task_index, out_file)
+        self.top_n = top_n
+        self.start = time.perf_counter()
+
+    def add_task(self, task_index, out_file, samples):
+        total = 0.0
+        for name, seconds, blocks in samples:
+            hist = self.stages.get(name)
+            if hist is None:
+                hist = self.stages[name] = _Histogram()
+            hist.add(seconds, blocks)
+            if name != 'task':
+                total += seconds
+        item = (total, task_index, out_file)
+        if len(self.slowest) < self.top_n:
+            heapq.heappush(self.slowest, item)
+        elif item > self.slowest[0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def summary(self):
+        wall = time.perf_counter() - self.start
+        stages = {}
+        for name, hist in sorted(self.stages.items(), key=lambda kv: -kv[1].total):
+            stages[name] = {
+                "count": hist.count,
+                "total_s": hist.total,
+                "share": hist.total / wall if wall else 0.0,
+                "mean_s": hist.total / hist.count,
+                "p50_s": hist.percentile(0.50),
+                "p90_s": hist.percentile(0.90),
+                "p99_s": hist.percentile(0.99),
+                "max_s": hist.max,
+                "alloc_blocks_total": hist.blocks,
+                "alloc_blocks_mean": hist.blocks / hist.count,
+            }
+        slowest = [{"task": i, "output": out, "seconds": s} for s, i, out in sorted(self.slowest, reverse=True)]
+        return {"wall_s": wall, "stages": stages, "slowest_tasks": slowest}
+
+    def report(self, path):
+        summary = self.summary()
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"\nProfile ({summary['wall_s']:.2f}s wall):")
+        print(f"  {'stage':<24}{'count':>9}{'total':>10}{'share':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}{'blocks/call':>13}")
+        for name, st in summary["stages"].items():
+            print(f"  {name:<24}{st['count']:>9}{st['total_s']:>9.2f}s{st['share'] * 100:>7.1f}%"
+                  f"{st['p50_s'] * 1e3:>8.2f}ms{st['p90_s'] * 1e3:>8.2f}ms{st['p99_s'] * 1e3:>8.2f}ms"
+                  f"{st['max_s'] * 1e3:>8.2f}ms{st['alloc_blocks_mean']:>13.1f}")
+        print("  Slowest tasks:")
+        for t in summary["slowest_tasks"]:
+            print(f"    #{t['task']:<8} {t['seconds'] * 1e3:>9.2f}ms  {t['output']}")
+        print(f"Saved profile to '{path}'")
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+from circuit_breaker import CRUCIBLE_VERSION
+
+class RunManifest:
+    # Append-only JSON-lines record of finished artifacts: task index, source path and content
+    # hash, error vector, master seed, output path and crucible version, one line per artifact.
+    # Later lines for the same output path win, so regenerating a task just appends.
+    #
+    # Entries are queued by record() and only appended once the writer reports the artifact
+    # durable (sync), so a killed run never lists an artifact it did not finish.
+    #
+    # Earlier entries are only read with load (--resume / --incremental); a run that just
+    # appends does not pay for the whole history. The last byte is still checked so a torn
+    # line from a killed run is not glued to the first new entry.
+    def __init__(self, path, master_seed, load=False):
+        self.path = path
+        self.master_seed = master_seed
+        # output path -> (task, seed, vector, source_hash, version) of its latest entry
+        self.done = {}
+        torn = False
+        if not load and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+        elif load and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    torn = not line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                        self.done[entry["output"]] = (entry["task"], entry["seed"], entry["vector"],
+                                                      entry["source_hash"], entry["version"])
+                    except (ValueError, KeyError, TypeError):
+                        continue # Torn last line of a killed run
+        self.known = len(self.done)
+        self.hashes = {}
+        self.pending = []
+        self.written = 0
+        self.skipped = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a')
+        if torn:
+            self.file.write('\n')
+
+    def source_hash(self, source_file):
+        digest = self.hashes.get(source_file)
+        if digest is None:
+            with open(source_file, 'rb') as f:
+                digest = self.hashes[source_file] = hashlib.sha256(f.read()).hexdigest()
+        return digest
+
+    def is_current(self, task, check_source=False):
+        # True if task (i, source_file, out_file, vector) already finished under this master seed.
+        # With check_source the source content hash and crucible version must also still match.
+        i, source_file, out_file, vector = task
+        entry = self.done.get(out_file)
+        if entry is None or entry[:3] != (i, self.master_seed, vector):
+            return False
+        if check_source and entry[3:] != (self.source_hash(source_file), CRUCIBLE_VERSION):
+            return False
+        self.skipped += 1
+        return True
+
+    def record(self, task):
+        # Queues a successfully written task; appended by the next sync that covers it
+        i, source_file, out_file, vector = task
+        self.pending.append(json.dumps({"task": i, "source": source_file, "source_hash": self.source_hash(source_file),
+                                        "vector": vector, "seed": self.master_seed, "output": out_file,
+                                        "version": CRUCIBLE_VERSION}) + "\n")
+
+    def sync(self, committed):
+        # Appends the queued entries for the first `committed` writes of this run that the writer
+        # has made durable (writer.committed counts writes in order, like record calls). Writes
+        # committed but not yet recorded (background writer) are covered by a later sync.
+        count = min(committed - self.written, len(self.pending))
+        if count > 0:
+            self.file.write("".join(self.pending[:count]))
+            self.file.flush()
+            del self.pending[:count]
+            self.written += count
+
+    def close(self):
+        self.file.close()
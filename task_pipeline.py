@@ -0,0 +1,200 @@
+import contextlib
+import io
+import itertools
+import os
+import time
+from circuit_breaker import ErrorInjector
+from profiler import stage
+from batch_injector import is_relabel_only
+from dedup_index import canonical_hash
+from graph_export import graph_record
+
+# Task planning and rendering shared by the CLI (main_breaker) and the in-memory API (crucible).
+# A task is (i, source_file, out_file, vector); i seeds every error bit via task_rng.
+
+# Serial-mode chunk size: the largest batch the relabel engine sees at once
+RELABEL_CHUNK = 64
+
+def render_task(templates, i, source_file, out_file, vector, master_seed, check_graph=False, verbose=True, events=None, profile=None, graph=None):
+    # Injects errors into a fresh copy of the source and returns the netlist with its provenance header.
+    # All randomness is derived from (master_seed, i, bit), so the result does not depend on run order.
+    # With --profile, per-stage (stage, seconds, alloc_blocks) samples are appended to `profile`.
+    # With --graph_export, the variant's graph record (see graph_export) is appended to `graph`.
+    with stage(profile, 'template'):
+        netlist_parser = templates.get(source_file)
+    
+    with stage(profile, 'graph_build'):
+        injector = ErrorInjector(netlist_parser, seed=master_seed, task_index=i, check_consistency=check_graph,
+                                 verbose=verbose, events=events, profile=profile)
+    injector.inject(vector)
+    
+    # Construct new circuit name: {original_name}_{bin}_{index}
+    filename_no_ext = os.path.splitext(os.path.basename(out_file))[0]
+    new_circuit_name = filename_no_ext
+    
+    with stage(profile, 'regenerate'):
+        new_content = netlist_parser.regenerate(new_circuit_name=new_circuit_name)
+
+    if graph is not None:
+        with stage(profile, 'graph_export'):
+            comps = netlist_parser.components
+            graph.append(graph_record(comps, [n for c in comps for n in c.net_names()], netlist_parser.ports))
+    
+    with stage(profile, 'header'):
+        return add_provenance(new_content, source_file, master_seed, i, vector)
+
+def add_provenance(new_content, source_file, master_seed, i, vector):
+    # Inserts the provenance header used by --reproduce after the TOPOLOGY marker
+    bin_full = f"{vector:016b}"
+    binary_str = f"{bin_full[:8]}_{bin_full[8:]}"
+
+    # Prepare Metadata Block
+    date_str = time.strftime('%a %b %d %H:%M:%S %Z %Y') # same format as date(1), without forking a shell
+    # Format: 0000_0000_0000_0001
+    # bin_full is 16 chars. binary_str is 8_8.
+    vector_str = binary_str 
+    
+    metadata = [
+        "* Generated By ASPECTOR Crucible",
+        f"* Derivative Netlist: {os.path.basename(source_file)}",
+        f"* Master Seed: {master_seed}",
+        f"* Task Index: {i}",
+        f"* Error Vector: {vector_str}",
+        f"* Date: {date_str}",
+        "" # Empty line
+    ]
+    metadata_block = "\n".join(metadata)
+    
+    # Inject metadata after *--- TOPOLOGY ---*
+    if "*--- TOPOLOGY ---*" in new_content:
+        new_content = new_content.replace("*--- TOPOLOGY ---*", f"*--- TOPOLOGY ---*\n\n{metadata_block}")
+    else:
+        # Fallback: Prepend if marker not found
+        new_content = metadata_block + "\n" + new_content
+
+    return new_content
+
+def render_chunk(templates, chunk, master_seed, check_graph=False, verbose=True, log_events=False, profile=False, relabel=True, dedup=False, graph=False):
+    # Renders a list of (i, source_file, out_file, vector) tasks and returns one
+    # (content, error, events, samples, output, topology, graph) per task, in order; console text is
+    # captured per task so callers can print it next to that task's result. With relabel,
+    # consecutive relabel-only vectors on the same source go through the vectorized RelabelEngine.
+    # With dedup, topology is the canonical topology hash of the rendered netlist; with graph,
+    # graph is the variant's graph_export record.
+    results = []
+    pos = 0
+    while pos < len(chunk):
+        _, source_file, _, vector = chunk[pos]
+        engine = None
+        if relabel and is_relabel_only(vector):
+            engine = templates.relabel_engine(source_file)
+        if engine is None:
+            results.append(_render_scalar(templates, chunk[pos], master_seed, check_graph, verbose, log_events, profile, graph))
+            pos += 1
+            continue
+        end = pos + 1
+        while end < len(chunk) and chunk[end][1] == source_file and is_relabel_only(chunk[end][3]):
+            end += 1
+        results.extend(_render_relabel(engine, chunk[pos:end], master_seed, verbose, log_events, profile, graph))
+        pos = end
+
+    keyed = []
+    for content, error, events, samples, output, record in results:
+        topology = None
+        if dedup and content is not None:
+            with stage(samples, 'dedup_hash'):
+                topology = canonical_hash(content)
+        keyed.append((content, error, events, samples, output, topology, record))
+    return keyed
+
+def _render_scalar(templates, task, master_seed, check_graph, verbose, log_events, profile, graph):
+    buf = io.StringIO()
+    content = error = None
+    events = [] if log_events else None
+    samples = [] if profile else None
+    records = [] if graph else None
+    with contextlib.redirect_stdout(buf):
+        try:
+            content = render_task(templates, *task, master_seed, check_graph=check_graph,
+                                  verbose=verbose, events=events, profile=samples, graph=records)
+        except Exception as e:
+            error = str(e)
+    record = records[0] if records and error is None else None
+    return content, error, events, samples, buf.getvalue(), record
+
+def _render_relabel(engine, tasks, master_seed, verbose, log_events, profile, graph):
+    events = [[] if log_events else None for _ in tasks]
+    samples = [[] if profile else None for _ in tasks]
+    variants = []
+    for (i, _, _, vector), ev, sm in zip(tasks, events, samples):
+        with stage(sm, 'relabel_inject'):
+            variants.append(engine.inject(vector, master_seed, i, verbose=verbose, events=ev))
+
+    # Batch resolve/render time is split evenly across the batch's tasks
+    batch = [] if profile else None
+    names = [os.path.splitext(os.path.basename(out_file))[0] for _, _, out_file, _ in tasks]
+    net_rows = [] if graph else None
+    try:
+        with stage(batch, 'relabel_render'):
+            contents = engine.render_batch(variants, names, net_rows)
+        error = None
+    except Exception as e:
+        contents, error = [None] * len(tasks), str(e)
+    if error is not None or not graph:
+        net_rows = [None] * len(tasks)
+
+    results = []
+    for (i, source_file, _, vector), variant, content, ev, sm, row in zip(tasks, variants, contents, events, samples, net_rows):
+        if batch:
+            sm.extend((name, seconds / len(tasks), blocks / len(tasks)) for name, seconds, blocks in batch)
+        record = None
+        if row is not None:
+            with stage(sm, 'graph_export'):
+                record = graph_record(engine.parser.components, row, engine.ports)
+        if content is not None:
+            with stage(sm, 'header'):
+                content = add_provenance(content, source_file, master_seed, i, vector)
+        output = "".join(line + "\n" for line in variant.output)
+        results.append((content, error, ev if error is None else None, sm, output, record))
+    return results
+
+def iter_batch_tasks(input_path, output_dir, batch_specs):
+    # Expands (count, vector, start_index) specs into (source_file, output_file, vector) tasks on demand
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    for count, vector, start_index in batch_specs:
+        # Format binary string 16-bit
+        bin_full = f"{vector:016b}"
+        # Insert underscore after 8th bit: 12345678_12345678
+        binary_str = f"{bin_full[:8]}_{bin_full[8:]}"
+        
+        for i in range(start_index, start_index + count):
+            filename = f"{base_name}_{binary_str}_{i}.scs"
+            yield (input_path, os.path.join(output_dir, filename), vector)
+
+def iter_random_tasks(source_files, output_dir, count, rng):
+    # Draws source and vector per task in the same order as a fully materialized plan
+    for i in range(count):
+        # Select random source
+        src = rng.choice(source_files)
+        # Select random vector (16-bit)
+        vector = rng.randint(0, 65535)
+        
+        bin_full = f"{vector:016b}"
+        binary_str = f"{bin_full[:8]}_{bin_full[8:]}"
+        base_name = os.path.splitext(os.path.basename(src))[0]
+        
+        # Filename: {original}_{vector}_{index}.scs
+        filename = f"{base_name}_{binary_str}_{i}.scs"
+        yield (src, os.path.join(output_dir, filename), vector)
+
+def iter_chunks(tasks, size, skip=None):
+    # Numbers tasks and groups them into lists of up to size (i, source_file, out_file, vector).
+    # Tasks for which skip(task) is true are dropped after numbering, so indices stay stable.
+    numbered = ((i, *task) for i, task in enumerate(tasks))
+    if skip is not None:
+        numbered = itertools.filterfalse(skip, numbered)
+    while True:
+        chunk = list(itertools.islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
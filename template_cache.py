@@ -0,0 +1,155 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from circuit_breaker import NetlistParser
+from batch_injector import RelabelEngine
+
+# Bump whenever the pickled NetlistParser/Component layout changes so stale
+# on-disk entries are ignored instead of loaded into an incompatible class.
+CACHE_FORMAT = 6
+
+# Resident size estimates per byte of source text (tracemalloc over 5 kB - 650 kB sources:
+# parsed templates 3-8x, relabel engines about 5x). Used only to enforce the memory cap.
+PARSED_BYTES_PER_SOURCE_BYTE = 8
+ENGINE_BYTES_PER_SOURCE_BYTE = 6
+
+class _Entry:
+    __slots__ = ('base', 'signature', 'source_size', 'engine', 'has_engine')
+
+    def __init__(self, base, signature, source_size):
+        self.base = base
+        self.signature = signature
+        self.source_size = source_size
+        self.engine = None
+        self.has_engine = False
+
+    def footprint(self):
+        per_byte = PARSED_BYTES_PER_SOURCE_BYTE
+        if self.engine is not None:
+            per_byte += ENGINE_BYTES_PER_SOURCE_BYTE
+        return per_byte * self.source_size
+
+class TemplateCache:
+    # LRU of parsed sources (and their relabel engines), keyed by path and validated against the
+    # file's (mtime, size) on every lookup, so an edited source is re-parsed. Least recently used
+    # sources are evicted once the estimated footprint exceeds max_bytes (None: unbounded); the
+    # source in use is always kept, even if it alone exceeds the cap.
+    def __init__(self, cache_dir=None, max_bytes=None):
+        # source path -> _Entry, least recently used first
+        self.entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+    def get(self, source_file):
+        # Returns a fresh, independently mutable copy of the parsed source
+        return self._entry(source_file).base.copy()
+
+    def relabel_engine(self, source_file):
+        # Vectorized engine for relabel-only vectors over the parsed source. None if the source
+        # cannot be represented as a flat terminal array; callers use the scalar path then.
+        entry = self._entry(source_file)
+        if not entry.has_engine:
+            try:
+                entry.engine = RelabelEngine(entry.base)
+            except ValueError:
+                entry.engine = None
+            entry.has_engine = True
+            self._resize(entry)
+        return entry.engine
+
+    def _entry(self, source_file):
+        signature = self._signature(source_file)
+        entry = self.entries.get(source_file)
+        if entry is not None:
+            if entry.signature == signature:
+                self.hits += 1
+                self.entries.move_to_end(source_file)
+                return entry
+            # Source changed on disk since it was parsed
+            self.stale += 1
+            self._drop(source_file)
+        self.misses += 1
+
+        entry = _Entry(self._load(source_file), signature, signature[1])
+        self.entries[source_file] = entry
+        self.size += entry.footprint()
+        self._evict()
+        return entry
+
+    @staticmethod
+    def _signature(source_file):
+        st = os.stat(source_file)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _resize(self, entry):
+        # Footprint changed (engine built); re-account and re-check the cap
+        self.size += entry.footprint() - entry.source_size * PARSED_BYTES_PER_SOURCE_BYTE
+        self._evict()
+
+    def _drop(self, source_file):
+        self.size -= self.entries.pop(source_file).footprint()
+
+    def _evict(self):
+        while self.max_bytes is not None and self.size > self.max_bytes and len(self.entries) > 1:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "evictions": self.evictions,
+                "disk_hits": self.disk_hits, "resident": len(self.entries), "resident_bytes": self.size}
+
+    def _load(self, source_file):
+        cache_file = None
+        if self.cache_dir:
+            # Content hash read in blocks; the parser streams the file too, so neither holds it whole
+            digest = hashlib.sha256(f"{CACHE_FORMAT}:".encode())
+            with open(source_file, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            digest = digest.hexdigest()
+            cache_file = os.path.join(self.cache_dir, f"{digest}.pkl")
+            if os.path.exists(cache_file):
+                try:
+                    with open(cache_file, 'rb') as f:
+                        base = pickle.load(f)
+                    base.filepath = source_file
+                    self.disk_hits += 1
+                    return base
+                except Exception:
+                    pass # Corrupt or incompatible entry, fall through and re-parse
+
+        base = NetlistParser(source_file)
+        base.parse()
+
+        if cache_file:
+            # Write-then-rename so concurrent runs never observe a partial pickle
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(base, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        return base
+
+def merge_cache_stats(all_stats):
+    # Sums the stats of several caches (one per worker process)
+    merged = dict.fromkeys(("hits", "misses", "stale", "evictions", "disk_hits", "resident", "resident_bytes"), 0)
+    for stats in all_stats:
+        for key, value in stats.items():
+            merged[key] += value
+    return merged
+
+def format_cache_stats(stats):
+    lookups = stats["hits"] + stats["misses"]
+    ratio = stats["hits"] / lookups if lookups else 0.0
+    return (f"Template cache: {stats['hits']} hits / {stats['misses']} misses (hit rate {ratio:.3f}), "
+            f"{stats['evictions']} evictions, {stats['stale']} reloads of changed sources, "
+            f"{stats['disk_hits']} loaded from disk cache, {stats['resident']} sources resident "
+            f"(~{stats['resident_bytes'] / 2**20:.1f} MiB)")